@@ -0,0 +1,53 @@
+# Gunicorn reads this file from the working directory (backend/)
+import gc
+import os
+import shutil
+import tempfile
+
+# Import the app once in the master and fork workers from it, so each worker
+# starts with the catalog indexes already built and shares their memory
+# copy-on-write instead of loading its own copy
+preload_app = True
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+
+# Each worker keeps its metrics in files here so /api/metrics, whichever
+# worker answers it, reports the sum over all of them. Set before the app
+# is imported, and emptied so a restart does not count the last run again
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'gaming-store-metrics'))
+shutil.rmtree(os.environ['PROMETHEUS_MULTIPROC_DIR'], ignore_errors=True)
+os.makedirs(os.environ['PROMETHEUS_MULTIPROC_DIR'])
+
+
+def when_ready(server):
+    """Runs in the master after the app is imported, before any worker is forked"""
+    from src.main import app, warm_up
+    warm_up(app)
+    # Move everything loaded so far out of the collector's reach; otherwise
+    # the first collection in each worker touches, and so copies, every page
+    gc.freeze()
+    server.log.info('Startup timings (ms): %s', app.extensions['startup_ms'])
+
+
+def post_fork(server, worker):
+    """Runs in each new worker"""
+    from src.main import app, start_background
+    from src.models.user import db
+    with app.app_context():
+        # Drop pooled connections inherited from the master without closing
+        # them, which would close the master's sockets too
+        db.engine.dispose(close=False)
+    start_background(app)
+
+
+def worker_exit(server, worker):
+    """Runs in each worker as it exits"""
+    from src.main import app, stop_background
+    stop_background(app)
+
+
+def child_exit(server, worker):
+    """Runs in the master when a worker exits"""
+    from src import metrics
+    if metrics.enabled():
+        # Drop the worker's share of the in-progress gauge
+        metrics.multiprocess.mark_process_dead(worker.pid)
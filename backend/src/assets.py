@@ -0,0 +1,149 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from flask import request
+from werkzeug.wrappers import Response
+
+try:
+    import brotli
+except ImportError:  # optional; gzip alone still applies
+    brotli = None
+
+# Only text formats are worth compressing; images are compressed already
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+# Hashed URLs never change content, so browsers may keep them for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# Served when a path is not a file, so the storefront's client-side routes work
+INDEX = 'index.html'
+
+# Local href/src attributes, optionally under /static/ as the storefront writes them
+_REFERENCE = re.compile(r'(?P<attr>(?:href|src)=["\'])(?P<prefix>/?(?:static/)?)(?P<path>[^"\':]+)(?P<quote>["\'])')
+
+
+class Asset:
+    """One static file with its compressed variants, all held in memory"""
+    __slots__ = ('path', 'hashed_path', 'mimetype', 'etag', 'variants')
+
+    def __init__(self, path, body, mimetype):
+        self.path = path
+        self.mimetype = mimetype
+        digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.etag = digest
+        stem, ext = os.path.splitext(path)
+        self.hashed_path = f'{stem}.{digest[:10]}{ext}'
+        self.variants = {'identity': body}
+        if mimetype.startswith(COMPRESSIBLE_TYPES):
+            self._compress(body)
+
+    def _compress(self, body):
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        if len(compressed) < len(body):
+            self.variants['gzip'] = compressed
+        if brotli is not None:
+            compressed = brotli.compress(body, quality=11)
+            if len(compressed) < len(body):
+                self.variants['br'] = compressed
+
+
+class AssetManifest:
+    """In-memory map of the static folder, built once at startup
+
+    Every file is read, hashed and pre-compressed up front, so a request is
+    a dict lookup with no filesystem access. Each file is reachable under
+    its plain name (revalidated with its ETag) and under a content-hashed
+    name such as script.3fa2c9d1e0.js (cached for a year as immutable).
+    index.html is rewritten to reference the hashed names.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._assets = {}
+        self._lock = threading.Lock()
+        self._built = False
+
+    def build(self):
+        assets = {}
+        if self.root and os.path.isdir(self.root):
+            for directory, _, filenames in os.walk(self.root):
+                for filename in filenames:
+                    full_path = os.path.join(directory, filename)
+                    path = os.path.relpath(full_path, self.root).replace(os.sep, '/')
+                    with open(full_path, 'rb') as stream:
+                        body = stream.read()
+                    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+                    assets[path] = Asset(path, body, mimetype)
+
+        # Point pages at the hashed names so browsers cache them for good
+        for path, asset in list(assets.items()):
+            if asset.mimetype == 'text/html':
+                body = self._rewrite(asset.variants['identity'], assets)
+                assets[path] = Asset(path, body, asset.mimetype)
+
+        by_name = dict(assets)
+        for asset in assets.values():
+            by_name[asset.hashed_path] = asset
+        # Swapped in whole, so readers see the old manifest or the new one
+        self._assets = by_name
+        self._built = True
+        return len(assets)
+
+    @staticmethod
+    def _rewrite(body, assets):
+        def replace(match):
+            asset = assets.get(match.group('path'))
+            if asset is None:
+                return match.group(0)
+            return f"{match.group('attr')}{match.group('prefix')}{asset.hashed_path}{match.group('quote')}"
+        return _REFERENCE.sub(replace, body.decode('utf-8')).encode('utf-8')
+
+    def get(self, path):
+        if not self._built:
+            with self._lock:
+                if not self._built:
+                    self.build()
+        return self._assets.get(path)
+
+    def serve(self, path):
+        """Response for a request path, falling back to index.html"""
+        if path.startswith('static/'):
+            path = path[len('static/'):]
+        asset = self.get(path) if path else None
+        if asset is None:
+            asset = self.get(INDEX)
+            if asset is None:
+                return Response('index.html not found', status=404)
+        return self._respond(asset, immutable=path == asset.hashed_path)
+
+    @staticmethod
+    def _encoding(asset):
+        accepted = request.accept_encodings
+        for encoding in ('br', 'gzip'):
+            if encoding in asset.variants and accepted[encoding]:
+                return encoding
+        return 'identity'
+
+    def _respond(self, asset, immutable):
+        encoding = self._encoding(asset)
+        # Each encoding is a different representation and needs its own ETag
+        etag = asset.etag if encoding == 'identity' else f'{asset.etag}-{encoding}'
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(asset.variants[encoding], mimetype=asset.mimetype)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        if len(asset.variants) > 1:
+            response.vary.add('Accept-Encoding')
+
+        response.cache_control.public = True
+        if immutable:
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        else:
+            response.cache_control.no_cache = True
+        return response
@@ -0,0 +1,125 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, g, jsonify, request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from src.models.user import User, db
+
+# Access tokens stay valid this long after login
+TOKEN_MAX_AGE = int(os.environ.get('ACCESS_TOKEN_MAX_AGE', str(7 * 24 * 3600)))
+# Cached users are re-read after this many seconds, which bounds how long
+# another worker can serve a profile changed elsewhere
+USER_CACHE_TTL = 60.0
+USER_CACHE_SIZE = 10_000
+
+
+def password_fingerprint(password_hash):
+    """Short digest of the password hash; changing the password voids old tokens"""
+    return hashlib.blake2b(password_hash.encode(), digest_size=6).hexdigest()
+
+
+def user_entry(user):
+    """What the cache keeps for a user: the public fields and the token fingerprint"""
+    return {
+        'id': user.id,
+        'name': user.username,
+        'email': user.email,
+        'phone': user.phone,
+        'created_at': user.created_at.isoformat() if user.created_at else None,
+        'fingerprint': password_fingerprint(user.password_hash)
+    }
+
+
+def public(entry):
+    return {key: value for key, value in entry.items() if key != 'fingerprint'}
+
+
+class UserCache:
+    """LRU cache of user entries by id, each kept for at most ttl seconds"""
+
+    def __init__(self, max_entries=USER_CACHE_SIZE, ttl=USER_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """The cached entry for user_id, reading the database on a miss; None if no such user"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(user_id)
+            if cached is not None and cached[0] > now:
+                self._entries.move_to_end(user_id)
+                return cached[1]
+
+        user = db.session.get(User, user_id)
+        if user is None:
+            self.invalidate(user_id)
+            return None
+        return self.put(user)
+
+    def put(self, user):
+        entry = user_entry(user)
+        with self._lock:
+            self._entries[user.id] = (time.monotonic() + self.ttl, entry)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+def user_cache():
+    """The current app's UserCache, kept in app.extensions['user_cache']"""
+    return current_app.extensions['user_cache']
+
+
+def _serializer():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt='access-token')
+
+
+def issue_token(user):
+    """Signed access token for a user; nothing is stored on the server"""
+    return _serializer().dumps({'uid': user.id, 'pw': password_fingerprint(user.password_hash)})
+
+
+def current_user():
+    """The user entry for the request's 'Authorization: Bearer' token, or None
+
+    Looked up once per request, normally from the cache without touching
+    the database.
+    """
+    if 'auth_user' in g:
+        return g.auth_user
+
+    entry = None
+    scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+    if scheme.lower() == 'bearer' and token:
+        try:
+            claims = _serializer().loads(token.strip(), max_age=TOKEN_MAX_AGE)
+            entry = user_cache().get(int(claims['uid']))
+            if entry is not None and entry['fingerprint'] != claims.get('pw'):
+                entry = None
+        except (BadSignature, KeyError, TypeError, ValueError):
+            entry = None
+    g.auth_user = entry
+    return entry
+
+
+def login_required(view):
+    """Reject requests without a valid access token with 401"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if current_user() is None:
+            return jsonify({
+                'success': False,
+                'message': 'يجب تسجيل الدخول'
+            }), 401
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,91 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, make_response, request
+from werkzeug.wrappers import Response
+from src.compression import MIN_SIZE, accepts_gzip, gzip_body
+
+
+class ResponseCache:
+    """LRU cache of serialized GET responses with strong ETags
+
+    Entries are keyed by endpoint, normalized query arguments and a data
+    version supplied by the view, so bumping the version (e.g. a catalog
+    change) makes every older entry unreachable; those age out of the LRU.
+    Clients presenting a matching If-None-Match get a bodiless 304.
+    Large bodies are gzipped once when cached rather than on every hit.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _put(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    @staticmethod
+    def _respond(entry, max_age):
+        body, gzipped, mimetype, etag = entry
+        if gzipped is not None and accepts_gzip():
+            body, etag, encoding = gzipped, f'{etag}-gzip', 'gzip'
+        else:
+            encoding = None
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype=mimetype)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        if gzipped is not None:
+            response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+        return response
+
+    def respond(self, view, args, kwargs, version, max_age):
+        """The cached response for this request, calling view on a miss"""
+        args_key = tuple(sorted(request.args.items(multi=True)))
+        key = (request.endpoint, tuple(sorted(kwargs.items())), args_key, version)
+
+        entry = self._get(key)
+        if entry is None:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            body = response.get_data()
+            etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+            gzipped = gzip_body(body) if len(body) >= MIN_SIZE else None
+            entry = (body, gzipped, response.mimetype, etag)
+            self._put(key, entry)
+
+        return self._respond(entry, max_age)
+
+
+def cached(version, max_age=60):
+    """Decorator caching a view's successful responses in the app's ResponseCache
+
+    version is a callable returning the current version of the data the
+    view reads from. The cache is app.extensions['response_cache'].
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = current_app.extensions['response_cache']
+            return cache.respond(view, args, kwargs, version(), max_age)
+        return wrapper
+    return decorator
@@ -0,0 +1,180 @@
+import os
+import secrets
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import delete, select
+from src.models.user import db
+from src.models.cart import Cart
+from src.pricing import MAX_QUANTITY, PricingError
+
+# Carts untouched for this long are swept away
+CART_TTL = timedelta(days=int(os.environ.get('CART_TTL_DAYS', '30')))
+SWEEP_INTERVAL = 600.0
+SWEEP_BATCH_SIZE = 500
+MAX_LINES = 100
+
+# One-letter codes keep stored carts small
+KIND_CODES = {'game': 'g', 'accessory': 'a'}
+CODE_KINDS = {code: kind for kind, code in KIND_CODES.items()}
+
+
+def decode_items(text):
+    """'g1:2,a3:1' -> {('game', 1): 2, ('accessory', 3): 1}, in insertion order"""
+    items = {}
+    for pair in text.split(',') if text else ():
+        product, quantity = pair.split(':')
+        items[(CODE_KINDS[product[0]], int(product[1:]))] = int(quantity)
+    return items
+
+
+def encode_items(items):
+    return ','.join(f'{KIND_CODES[kind]}{product_id}:{quantity}' for (kind, product_id), quantity in items.items())
+
+
+def new_cart(user_id=None):
+    cart = Cart(id=secrets.token_hex(16), user_id=user_id, items='', expires_at=datetime.utcnow() + CART_TTL)
+    db.session.add(cart)
+    return cart
+
+
+def get_cart(cart_id):
+    """A live cart by id, or None when it is unknown or expired"""
+    cart = db.session.get(Cart, cart_id) if cart_id else None
+    if cart is None or cart.expires_at <= datetime.utcnow():
+        return None
+    return cart
+
+
+def save_items(cart, items):
+    cart.items = encode_items(items)
+    cart.expires_at = datetime.utcnow() + CART_TTL
+
+
+def set_quantity(cart, price_book, kind, product_id, quantity, add=False):
+    """Set (or with add=True increase) a line's quantity; 0 removes the line
+
+    The product must exist and be on sale, checked against the price book.
+    """
+    if kind not in KIND_CODES:
+        raise PricingError('المنتج غير موجود')
+    try:
+        product_id, quantity = int(product_id), int(quantity)
+    except (TypeError, ValueError):
+        raise PricingError('بيانات المنتج غير صحيحة')
+
+    items = decode_items(cart.items)
+    key = (kind, product_id)
+    if add:
+        quantity += items.get(key, 0)
+    if quantity <= 0:
+        items.pop(key, None)
+    else:
+        quantity = min(quantity, MAX_QUANTITY)
+        price_book.price_line(kind, product_id, quantity)
+        if key not in items and len(items) >= MAX_LINES:
+            raise PricingError(f'لا يمكن أن تحتوي السلة على أكثر من {MAX_LINES} منتج')
+        items[key] = quantity
+    save_items(cart, items)
+
+
+def merge_into_user_cart(user_id, cart_id=None):
+    """The user's cart, created if needed, with an anonymous cart folded into it
+
+    Quantities of products in both carts are added up; the anonymous cart
+    is deleted. Runs in the caller's transaction.
+    """
+    cart = Cart.query.filter_by(user_id=user_id).first()
+    if cart is None:
+        cart = new_cart(user_id)
+    elif cart.expires_at <= datetime.utcnow():
+        # Not swept yet; start the user over with an empty cart
+        save_items(cart, {})
+
+    anonymous = get_cart(cart_id)
+    if anonymous is not None and anonymous.id != cart.id and anonymous.user_id is None:
+        items = decode_items(cart.items)
+        for key, quantity in decode_items(anonymous.items).items():
+            if key in items or len(items) < MAX_LINES:
+                items[key] = min(items.get(key, 0) + quantity, MAX_QUANTITY)
+        db.session.delete(anonymous)
+        save_items(cart, items)
+    return cart
+
+
+def order_items(cart):
+    """Cart lines in the shape create_order accepts"""
+    return [
+        {'type': kind, 'id': product_id, 'quantity': quantity}
+        for (kind, product_id), quantity in decode_items(cart.items).items()
+    ]
+
+
+def priced(cart, price_book):
+    """Cart contents priced from the catalog
+
+    Lines whose product was removed or sold out since it was added are
+    listed under 'unavailable' and left out of the total.
+    """
+    lines, unavailable = [], []
+    for (kind, product_id), quantity in decode_items(cart.items).items():
+        try:
+            lines.append(price_book.price_line(kind, product_id, quantity))
+        except PricingError:
+            unavailable.append({'type': kind, 'id': product_id, 'quantity': quantity})
+    return {
+        'id': cart.id,
+        'items': lines,
+        'unavailable': unavailable,
+        'count': sum(line['quantity'] for line in lines),
+        'total': round(sum(line['price'] * line['quantity'] for line in lines), 2),
+        'expires_at': cart.expires_at.isoformat()
+    }
+
+
+def sweep_expired(batch_size=SWEEP_BATCH_SIZE):
+    """Delete expired carts in small batches; returns how many were removed"""
+    removed = 0
+    while True:
+        ids = db.session.execute(
+            select(Cart.id).where(Cart.expires_at <= datetime.utcnow()).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return removed
+        db.session.execute(delete(Cart).where(Cart.id.in_(ids)))
+        db.session.commit()
+        removed += len(ids)
+
+
+class CartSweeper(threading.Thread):
+    """Background thread removing expired carts every SWEEP_INTERVAL seconds"""
+
+    def __init__(self, app, interval=SWEEP_INTERVAL):
+        super().__init__(name='cart-sweeper', daemon=True)
+        self.app = app
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        self.join(timeout)
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                with self.app.app_context():
+                    sweep_expired()
+            except Exception:
+                self.app.logger.exception('Cart sweeper error')
+
+
+_start_lock = threading.Lock()
+
+
+def start_sweeper(app):
+    """Start app's expired cart sweeper in this process"""
+    with _start_lock:
+        sweeper = app.extensions.get('cart_sweeper')
+        if sweeper is None:
+            sweeper = app.extensions['cart_sweeper'] = CartSweeper(app)
+            sweeper.start()
+    return sweeper
@@ -0,0 +1,158 @@
+from bisect import bisect_left, bisect_right, insort
+
+
+def normalize(value):
+    """Case-folded form of a field value used as an index key"""
+    return value.lower() if isinstance(value, str) else value
+
+
+def field_values(product, field):
+    """A field's values as a sequence; list-valued fields such as 'platform' give each element"""
+    value = product.get(field)
+    if value is None:
+        return ()
+    if isinstance(value, (list, tuple, set)):
+        return value
+    return (value,)
+
+
+class CatalogStore:
+    """In-memory product catalog with a primary-key index and a price index.
+
+    Products are plain dicts keyed by their 'id'. Prices are kept in a
+    sorted array so range queries use bisect. Listeners registered with
+    ``subscribe`` are told about every change so derived structures
+    (facets, search, suggestions) can follow along.
+    """
+
+    def __init__(self, products=()):
+        self.version = 0
+        self._by_id = {}
+        self._by_price = []
+        self._listeners = []
+
+        for product in products:
+            self.upsert(product)
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __contains__(self, product_id):
+        return product_id in self._by_id
+
+    def _index(self, product):
+        insort(self._by_price, (product['price'], product['id']))
+
+    def _unindex(self, product):
+        entry = (product['price'], product['id'])
+        position = bisect_left(self._by_price, entry)
+        if position < len(self._by_price) and self._by_price[position] == entry:
+            del self._by_price[position]
+
+    def subscribe(self, listener):
+        """Register listener(old, new) for product changes
+
+        The listener is replayed every product already in the store, then
+        called with (None, product) on insert, (old, product) on replace and
+        (product, None) on removal.
+        """
+        for product in self._by_id.values():
+            listener(None, product)
+        self._listeners.append(listener)
+
+    def _notify(self, old, new):
+        for listener in self._listeners:
+            listener(old, new)
+
+    def upsert(self, product):
+        """Insert a product or replace the existing one with the same id"""
+        old = self._by_id.get(product['id'])
+        if old is not None:
+            self._unindex(old)
+        self._by_id[product['id']] = product
+        self._index(product)
+        self.version += 1
+        self._notify(old, product)
+        return old
+
+    def remove(self, product_id):
+        """Remove a product by id, returning it (or None if it was not present)"""
+        product = self._by_id.pop(product_id, None)
+        if product is not None:
+            self._unindex(product)
+            self.version += 1
+            self._notify(product, None)
+        return product
+
+    def get(self, product_id):
+        return self._by_id.get(product_id)
+
+    def all(self):
+        return list(self._by_id.values())
+
+    def by_price(self, min_price=None, max_price=None):
+        """Products whose price lies in [min_price, max_price], cheapest first"""
+        low = 0 if min_price is None else bisect_left(self._by_price, (min_price,))
+        if max_price is None:
+            high = len(self._by_price)
+        else:
+            high = bisect_right(self._by_price, (max_price, float('inf')))
+        return [self._by_id[product_id] for _, product_id in self._by_price[low:high]]
+
+
+class TopRatedIndex:
+    """In-stock products ordered by rating, overall and per category
+
+    Each ranking is a sorted array of (-rating, id), so the top k is a
+    slice and a rating or stock change is one bisect removal plus one
+    insort. Subscribe an instance to a CatalogStore to keep it current.
+    """
+
+    def __init__(self):
+        self._overall = []
+        self._by_category = {}
+
+    @staticmethod
+    def _entry(product):
+        return (-product.get('rating', 0), product['id'])
+
+    @staticmethod
+    def _discard(ranking, entry):
+        position = bisect_left(ranking, entry)
+        if position < len(ranking) and ranking[position] == entry:
+            del ranking[position]
+
+    def add(self, product):
+        if not product.get('in_stock', True):
+            return
+        entry = self._entry(product)
+        insort(self._overall, entry)
+        category = product.get('category', '').lower()
+        insort(self._by_category.setdefault(category, []), entry)
+
+    def remove(self, product):
+        if not product.get('in_stock', True):
+            return
+        entry = self._entry(product)
+        self._discard(self._overall, entry)
+        category = product.get('category', '').lower()
+        ranking = self._by_category.get(category)
+        if ranking is not None:
+            self._discard(ranking, entry)
+            if not ranking:
+                del self._by_category[category]
+
+    def on_change(self, old, new):
+        """CatalogStore listener: move the changed product in the rankings"""
+        if old is not None:
+            self.remove(old)
+        if new is not None:
+            self.add(new)
+
+    def top(self, k, category=None):
+        """Ids of the k highest rated in-stock products, optionally in one category"""
+        if category:
+            ranking = self._by_category.get(category.lower(), [])
+        else:
+            ranking = self._overall
+        return [product_id for _, product_id in ranking[:k]]
@@ -0,0 +1,233 @@
+import csv
+import json
+import sys
+from datetime import datetime
+import click
+from flask.cli import AppGroup
+from sqlalchemy import insert, select, update
+from src.models.user import db
+from src.models.product import Game, Accessory
+
+MODELS = {'games': Game, 'accessories': Accessory}
+FORMATS = ('csv', 'jsonl')
+BATCH_SIZE = 1000
+
+# Columns every product kind shares, in export order
+BASE_FIELDS = ['sku', 'name', 'price', 'category', 'description', 'image', 'rating', 'in_stock', 'stock_quantity']
+KIND_FIELDS = {'games': ['platform'], 'accessories': ['brand', 'features']}
+# List-valued columns; CSV files separate their items with '|'
+LIST_FIELDS = {'platform', 'features'}
+
+
+def detect_format(path, fmt=None):
+    if fmt:
+        return fmt
+    return 'csv' if str(path).lower().endswith('.csv') else 'jsonl'
+
+
+def read_records(stream, fmt):
+    """Yield (record, line_number) pairs from a CSV or JSONL stream, one at a time
+
+    A JSONL line that does not parse is yielded as a None record so the
+    caller can report it and carry on.
+    """
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield record, reader.line_num
+        return
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line), line_number
+        except ValueError:
+            yield None, line_number
+
+
+def _parse_list(value):
+    if value is None or value == '':
+        return []
+    if isinstance(value, list):
+        return [str(item) for item in value]
+    value = str(value).strip()
+    if value.startswith('['):
+        return [str(item) for item in json.loads(value)]
+    return [item.strip() for item in value.split('|') if item.strip()]
+
+
+TRUE_VALUES = ('1', 'true', 'yes', 'y')
+FALSE_VALUES = ('0', 'false', 'no', 'n')
+
+
+def _parse_bool(value, default=True):
+    """A yes/no column; blank cells (common in spreadsheets) take the default"""
+    if isinstance(value, bool):
+        return value
+    if value is None or str(value).strip() == '':
+        return default
+    text = str(value).strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f'invalid in_stock value {value!r}')
+
+
+def _parse_quantity(value):
+    if value is None or value == '':
+        return None
+    quantity = int(value)
+    if quantity < 0:
+        raise ValueError('negative stock_quantity')
+    return quantity
+
+
+def normalize_record(kind, record):
+    """Validate one import record and convert it to column values
+
+    Raises ValueError when a required field is missing or malformed.
+    """
+    if not isinstance(record, dict):
+        raise ValueError('malformed record')
+    for field in ('sku', 'name', 'price', 'category'):
+        if record.get(field) in (None, ''):
+            raise ValueError(f'missing {field}')
+
+    row = {
+        'sku': str(record['sku']).strip(),
+        'name': str(record['name']).strip(),
+        'price': float(record['price']),
+        'category': str(record['category']).strip(),
+        'description': record.get('description') or '',
+        'image': record.get('image') or None,
+        'rating': float(record.get('rating') or 0),
+        'in_stock': _parse_bool(record.get('in_stock'))
+    }
+    # Files without the column leave stock levels alone; a blank value stops
+    # tracking and a quantity of 0 marks the product out of stock
+    if 'stock_quantity' in record:
+        row['stock_quantity'] = _parse_quantity(record['stock_quantity'])
+        if row['stock_quantity'] is not None:
+            row['in_stock'] = row['in_stock'] and row['stock_quantity'] > 0
+    for field in KIND_FIELDS[kind]:
+        value = record.get(field)
+        row[field] = _parse_list(value) if field in LIST_FIELDS else (value or None)
+    return row
+
+
+def _flush_batch(model, batch):
+    """Upsert one batch by SKU with a single lookup, one bulk INSERT and one bulk UPDATE"""
+    now = datetime.utcnow()
+    existing = dict(db.session.execute(
+        select(model.sku, model.id).where(model.sku.in_(list(batch)))
+    ).all())
+
+    inserts, updates = [], []
+    for sku, row in batch.items():
+        row['updated_at'] = now
+        if sku in existing:
+            updates.append(dict(row, id=existing[sku]))
+        else:
+            inserts.append(dict(row, created_at=now))
+
+    if inserts:
+        db.session.execute(insert(model), inserts)
+    if updates:
+        db.session.execute(update(model), updates)
+    db.session.commit()
+    return len(inserts), len(updates)
+
+
+def import_catalog(stream, kind, fmt, batch_size=BATCH_SIZE, on_error=None):
+    """Stream products into the database, upserting by SKU in batches
+
+    Only one batch is held in memory at a time. Rows that fail validation
+    are skipped and reported through on_error(line_number, message). Returns
+    (inserted, updated, skipped).
+    """
+    model = MODELS[kind]
+    inserted = updated = skipped = 0
+    batch = {}
+
+    for record, line_number in read_records(stream, fmt):
+        try:
+            row = normalize_record(kind, record)
+        except (ValueError, TypeError) as e:
+            skipped += 1
+            if on_error:
+                on_error(line_number, str(e))
+            continue
+        # A later row for the same SKU in a batch wins
+        batch[row['sku']] = row
+
+        if len(batch) >= batch_size:
+            added, changed = _flush_batch(model, batch)
+            inserted, updated = inserted + added, updated + changed
+            batch = {}
+
+    if batch:
+        added, changed = _flush_batch(model, batch)
+        inserted, updated = inserted + added, updated + changed
+
+    return inserted, updated, skipped
+
+
+def export_catalog(stream, kind, fmt, batch_size=BATCH_SIZE):
+    """Stream every product of a kind to CSV or JSONL, ordered by id"""
+    model = MODELS[kind]
+    fields = BASE_FIELDS + KIND_FIELDS[kind]
+    writer = None
+    if fmt == 'csv':
+        writer = csv.DictWriter(stream, fieldnames=fields)
+        writer.writeheader()
+
+    count = 0
+    query = select(model).order_by(model.id).execution_options(yield_per=batch_size)
+    for product in db.session.execute(query).scalars():
+        data = product.to_dict()
+        data['stock_quantity'] = product.stock_quantity
+        record = {field: data[field] for field in fields}
+        if writer:
+            for field in LIST_FIELDS & record.keys():
+                record[field] = '|'.join(record[field] or [])
+            writer.writerow(record)
+        else:
+            stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+
+catalog_cli = AppGroup('catalog', help='Bulk import and export of the product catalog.')
+
+
+@catalog_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--kind', type=click.Choice(list(MODELS)), required=True)
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), help='Defaults to the file extension.')
+@click.option('--batch-size', default=BATCH_SIZE, show_default=True)
+def import_command(path, kind, fmt, batch_size):
+    """Upsert products from a CSV or JSONL file by SKU"""
+    def report(line_number, message):
+        click.echo(f'Skipping line {line_number}: {message}', err=True)
+
+    with open(path, newline='', encoding='utf-8') as stream:
+        inserted, updated, skipped = import_catalog(
+            stream, kind, detect_format(path, fmt), batch_size, on_error=report
+        )
+    click.echo(f'Imported {kind}: {inserted} inserted, {updated} updated, {skipped} skipped')
+
+
+@catalog_cli.command('export')
+@click.argument('path', default='-')
+@click.option('--kind', type=click.Choice(list(MODELS)), required=True)
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), help='Defaults to the file extension.')
+def export_command(path, kind, fmt):
+    """Write products to a CSV or JSONL file ('-' for stdout)"""
+    fmt = detect_format(path, fmt)
+    if path == '-':
+        count = export_catalog(sys.stdout, kind, fmt)
+    else:
+        with open(path, 'w', newline='', encoding='utf-8') as stream:
+            count = export_catalog(stream, kind, fmt)
+    click.echo(f'Exported {count} {kind}', err=True)
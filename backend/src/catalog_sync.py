@@ -0,0 +1,88 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select
+from src.models.user import db
+
+# How often a worker checks the database for catalog changes
+REFRESH_INTERVAL = 5.0
+# Rows stamped shortly before a refresh but committed after it started
+# are still picked up by the next one
+REFRESH_OVERLAP = timedelta(seconds=2)
+LOAD_BATCH_SIZE = 1000
+
+
+class CatalogSync:
+    """Keeps an in-memory CatalogStore in step with a product table
+
+    The first load streams the whole table into the store. After that only
+    rows whose updated_at is newer than the previous refresh are re-read, at
+    most every REFRESH_INTERVAL seconds, so every gunicorn worker converges
+    on the same catalog without a full reload. Products are upserted, never
+    deleted; take a product off sale with in_stock instead.
+    """
+
+    def __init__(self, model, store, seed=(), sku_prefix='product'):
+        self.model = model
+        self.store = store
+        self.seed = seed
+        self.sku_prefix = sku_prefix
+        self._since = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def seed_if_empty(self):
+        """Insert the bundled sample products into an empty table"""
+        if self.seed and not db.session.query(self.model.id).first():
+            rows = [{key: value for key, value in product.items() if key != 'id'} for product in self.seed]
+            for position, row in enumerate(rows, start=1):
+                row.setdefault('sku', f'{self.sku_prefix}-{position}')
+            db.session.execute(insert(self.model), rows)
+            db.session.commit()
+
+    def _apply(self, query):
+        for product in db.session.execute(query.execution_options(yield_per=LOAD_BATCH_SIZE)).scalars():
+            data = product.to_dict()
+            # Rows re-read because of the overlap are skipped so the version
+            # only moves (and caches only drop) on real changes
+            if self.store.get(data['id']) != data:
+                self.store.upsert(data)
+
+    @property
+    def loaded(self):
+        return self._since is not None
+
+    def load(self):
+        """Seed if needed and load every product into the store"""
+        self.seed_if_empty()
+        self._refresh()
+
+    def _refresh(self):
+        started_at = datetime.utcnow()
+        query = select(self.model).order_by(self.model.id)
+        if self._since is not None:
+            query = query.where(self.model.updated_at >= self._since)
+        self._apply(query)
+        self._since = started_at - REFRESH_OVERLAP
+        self._checked_at = time.monotonic()
+
+    def refresh_if_stale(self):
+        """Refresh when the last check is older than REFRESH_INTERVAL
+
+        The first call loads the catalog if nothing has yet, holding up
+        requests until it is ready rather than serving an empty catalog.
+        """
+        if not self.loaded:
+            with self._lock:
+                if not self.loaded:
+                    self.load()
+            return
+        if time.monotonic() - self._checked_at < REFRESH_INTERVAL:
+            return
+        # Another thread is already refreshing; keep serving the current catalog
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._refresh()
+        finally:
+            self._lock.release()
@@ -0,0 +1,58 @@
+import gzip
+from flask import request
+from src.assets import COMPRESSIBLE_TYPES
+
+# Smaller bodies fit in a packet or two either way and are not worth the CPU
+MIN_SIZE = 1024
+# zlib's default: most of level 9's saving for a fraction of its time
+COMPRESS_LEVEL = 6
+
+
+def gzip_body(body):
+    """gzip-compressed body, or None when compressing does not make it smaller"""
+    compressed = gzip.compress(body, compresslevel=COMPRESS_LEVEL, mtime=0)
+    return compressed if len(compressed) < len(body) else None
+
+
+def accepts_gzip():
+    return bool(request.accept_encodings['gzip'])
+
+
+def compressible(response):
+    """True for complete, uncompressed text bodies of at least MIN_SIZE bytes
+
+    Responses that already vary on Accept-Encoding chose their encoding
+    themselves (static assets, cached catalog responses) and are skipped,
+    as are streamed and file responses.
+    """
+    return (
+        response.status_code == 200
+        and not response.direct_passthrough
+        and not response.is_streamed
+        and 'Content-Encoding' not in response.headers
+        and 'accept-encoding' not in response.vary
+        and response.mimetype.startswith(COMPRESSIBLE_TYPES)
+        and response.content_length is not None
+        and response.content_length >= MIN_SIZE
+    )
+
+
+def compress_response(response):
+    """after_request hook gzipping large JSON and text responses"""
+    if not compressible(response):
+        return response
+    # Another client may get the other encoding, so shared caches must key on it
+    response.vary.add('Accept-Encoding')
+    if not accepts_gzip():
+        return response
+
+    compressed = gzip_body(response.get_data())
+    if compressed is None:
+        return response
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = 'gzip'
+    # The compressed body is a different representation and needs its own ETag
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f'{etag}-gzip', weak=weak)
+    return response
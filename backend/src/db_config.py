@@ -0,0 +1,58 @@
+import os
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_DATABASE_URL = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+# Milliseconds a SQLite writer waits for the lock before failing with "database is locked"
+SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', '5000'))
+
+
+def database_url():
+    """DATABASE_URL from the environment, or the bundled SQLite file
+
+    Render and Heroku hand out postgres:// URLs, which SQLAlchemy 1.4+
+    only accepts as postgresql://.
+    """
+    url = os.environ.get('DATABASE_URL') or DEFAULT_DATABASE_URL
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_options(url):
+    """Connection pool settings for SQLALCHEMY_ENGINE_OPTIONS
+
+    Server databases get a bounded pool whose connections are checked
+    before use (pre-ping) and replaced before servers or proxies drop idle
+    ones (recycle). SQLite connections are local files and only need the
+    pragmas below.
+    """
+    if url.startswith('sqlite'):
+        return {'connect_args': {'timeout': SQLITE_BUSY_TIMEOUT / 1000}}
+    return {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', '10')),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', '1800')),
+        'pool_pre_ping': True
+    }
+
+
+@event.listens_for(Engine, 'connect')
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    """Let SQLite readers run alongside the writer, and enforce foreign keys
+
+    WAL mode stops readers and the single writer from blocking each other,
+    synchronous=NORMAL is durable in WAL mode except on power loss, and the
+    busy timeout makes concurrent writers queue instead of failing. SQLite
+    ignores foreign keys, ON DELETE rules included, unless asked per
+    connection.
+    """
+    if type(dbapi_connection).__module__ != 'sqlite3':
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}')
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
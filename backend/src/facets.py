@@ -0,0 +1,222 @@
+from bisect import bisect_left, bisect_right, insort
+from flask import jsonify, request
+from src.catalog import field_values, normalize
+from src.pagination import page_args, slice_by_id
+
+
+class FacetIndex:
+    """Bitset-per-facet-value index for filtering and counting products
+
+    Every product gets a bit position (slot). Each value of a facet field
+    (category, platform, brand, in_stock...) keeps a Python int with the
+    bits of the products carrying it, so combining filters is a handful of
+    big-integer AND/ORs and a facet count is a popcount. Price and rating
+    ranges come from sorted arrays turned into a bitset on demand.
+    Subscribe an instance to a CatalogStore to keep it current.
+    """
+
+    def __init__(self, fields=('category',)):
+        self.fields = tuple(fields)
+        self._slots = {}
+        self._ids = []
+        self._free = []
+        self._all = 0
+        self._bits = {field: {} for field in self.fields}
+        self._labels = {field: {} for field in self.fields}
+        self._prices = []
+        self._ratings = []
+
+    def add(self, product):
+        if product['id'] in self._slots:
+            self.remove(product)
+
+        slot = self._free.pop() if self._free else len(self._ids)
+        if slot == len(self._ids):
+            self._ids.append(product['id'])
+        else:
+            self._ids[slot] = product['id']
+        self._slots[product['id']] = slot
+
+        bit = 1 << slot
+        self._all |= bit
+        for field in self.fields:
+            bits, labels = self._bits[field], self._labels[field]
+            for value in field_values(product, field):
+                key = normalize(value)
+                bits[key] = bits.get(key, 0) | bit
+                labels.setdefault(key, value)
+        insort(self._prices, (product.get('price', 0), slot))
+        insort(self._ratings, (product.get('rating', 0), slot))
+
+    def remove(self, product):
+        slot = self._slots.pop(product['id'], None)
+        if slot is None:
+            return
+
+        bit = 1 << slot
+        self._all &= ~bit
+        for field in self.fields:
+            bits = self._bits[field]
+            for value in field_values(product, field):
+                key = normalize(value)
+                if key not in bits:
+                    continue
+                bits[key] &= ~bit
+                if not bits[key]:
+                    del bits[key]
+                    del self._labels[field][key]
+        for ranking, value in ((self._prices, product.get('price', 0)), (self._ratings, product.get('rating', 0))):
+            position = bisect_left(ranking, (value, slot))
+            if position < len(ranking) and ranking[position] == (value, slot):
+                del ranking[position]
+
+        self._ids[slot] = None
+        self._free.append(slot)
+
+    def on_change(self, old, new):
+        """CatalogStore listener: move the changed product's bits"""
+        if old is not None:
+            self.remove(old)
+        if new is not None:
+            self.add(new)
+
+    def values(self, field):
+        """Distinct values of a facet field, in the casing first seen"""
+        return list(self._labels[field].values())
+
+    def _range_mask(self, ranking, low=None, high=None):
+        start = 0 if low is None else bisect_left(ranking, (low,))
+        end = len(ranking) if high is None else bisect_right(ranking, (high, float('inf')))
+        # Set bits in a byte buffer and convert once; OR-ing ints one slot
+        # at a time would copy the whole bitset for every product
+        buffer = bytearray((len(self._ids) + 7) // 8)
+        for _, slot in ranking[start:end]:
+            buffer[slot >> 3] |= 1 << (slot & 7)
+        return int.from_bytes(buffer, 'little')
+
+    def _mask(self, field, condition):
+        if field == 'price':
+            return self._range_mask(self._prices, *condition)
+        if field == 'rating':
+            return self._range_mask(self._ratings, *condition)
+        bits = self._bits[field]
+        mask = 0
+        for value in condition:
+            mask |= bits.get(normalize(value), 0)
+        return mask
+
+    def _ids_of(self, mask):
+        # Walk the binary digits least significant first, finding set bits in C
+        digits = bin(mask)[:1:-1]
+        ids = []
+        position = digits.find('1')
+        while position != -1:
+            ids.append(self._ids[position])
+            position = digits.find('1', position + 1)
+        return sorted(ids)
+
+    def query(self, criteria, match='all', with_counts=False):
+        """Ids of matching products (ascending) and optional facet counts
+
+        criteria maps a facet field to the list of values accepted for it
+        (any of them matches), or 'price'/'rating' to a (low, high) range
+        with None for an open end. Fields are combined with AND when match
+        is 'all' and with OR when it is 'any'. Counts follow the usual
+        faceted-search rule: a field's counts apply every filter except its
+        own, so sibling values stay selectable.
+        """
+        masks = {field: self._mask(field, condition) for field, condition in criteria.items()}
+
+        if not masks:
+            result = self._all
+        elif match == 'any':
+            result = 0
+            for mask in masks.values():
+                result |= mask
+        else:
+            result = self._all
+            for mask in masks.values():
+                result &= mask
+
+        counts = None
+        if with_counts:
+            counts = {}
+            for field in self.fields:
+                if match == 'any' or field not in masks:
+                    base = result
+                else:
+                    base = self._all
+                    for other, mask in masks.items():
+                        if other != field:
+                            base &= mask
+                counts[field] = {
+                    self._labels[field][key]: (base & bits).bit_count()
+                    for key, bits in self._bits[field].items()
+                }
+
+        return self._ids_of(result), counts
+
+
+def _parse_bool(value):
+    return value.strip().lower() in ('1', 'true', 'yes')
+
+
+def criteria_from_request(fields):
+    """Facet criteria from the query string of the current request
+
+    Repeat a parameter to accept several values (?category=action&category=rpg).
+    Supports min_price/max_price, min_rating and in_stock=true|false.
+    """
+    criteria = {}
+    for field in fields:
+        if field == 'in_stock':
+            values = [_parse_bool(value) for value in request.args.getlist(field) if value]
+        else:
+            values = [value for value in request.args.getlist(field) if value]
+        if values:
+            criteria[field] = values
+
+    min_price = request.args.get('min_price', type=float)
+    max_price = request.args.get('max_price', type=float)
+    if min_price is not None or max_price is not None:
+        criteria['price'] = (min_price, max_price)
+
+    min_rating = request.args.get('min_rating', type=float)
+    if min_rating is not None:
+        criteria['rating'] = (min_rating, None)
+
+    return criteria
+
+
+def faceted_listing(store, facets, key):
+    """Response for a catalog list endpoint: one page of products under key
+
+    Filters come from the query string (see criteria_from_request);
+    match=any ORs them instead of ANDing them and facets=1 adds per-value
+    counts. total is the number of matching products across all pages.
+    """
+    criteria = criteria_from_request(facets.fields)
+    match = 'any' if request.args.get('match') == 'any' else 'all'
+    with_counts = request.args.get('facets', '').lower() in ('1', 'true')
+
+    ids, counts = facets.query(criteria, match, with_counts)
+
+    try:
+        limit, after = page_args()
+        page, next_cursor = slice_by_id(ids, limit, after, key=int)
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'Invalid pagination parameters'
+        }), 400
+
+    response = {
+        'success': True,
+        key: [store.get(product_id) for product_id in page],
+        'total': len(ids),
+        'next_cursor': next_cursor
+    }
+    if counts is not None:
+        response['facets'] = counts
+
+    return jsonify(response)
@@ -0,0 +1,163 @@
+import hashlib
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+
+try:
+    from PIL import Image
+except ImportError:  # optional; without it the original images are served
+    Image = None
+
+# Card widths to produce, in pixels; browsers pick one from the srcset
+WIDTHS = (320, 640)
+# Output formats by file extension: WebP for browsers that take it, JPEG otherwise
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 6}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True})
+}
+SOURCE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp')
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.image-cache')
+# Source image hashes remembered, least recently used dropped first
+MAX_HASHES = 4096
+
+# fifa2024-0123456789ab-320.webp
+_DERIVATIVE_NAME = re.compile(r'^(?P<stem>.+)-(?P<hash>[0-9a-f]{12})-(?P<width>\d+)\.(?P<ext>[a-z]+)$')
+
+
+def _is_source_name(name):
+    """True for a plain file name: no directories, not hidden, nothing like '..'"""
+    return (
+        bool(name) and '/' not in name and '\\' not in name
+        and not name.startswith('.') and os.path.basename(name) == name
+    )
+
+
+class ImagePipeline:
+    """Resized and WebP copies of product images, made on first request
+
+    A derivative's file name carries the hash of the source it was made
+    from, so replacing a source image changes its URLs: the new size is
+    generated on first use and browsers may cache every derivative URL
+    forever. Derivatives live in cache_dir and are shared by all workers;
+    each is written to a temporary file and renamed into place.
+    """
+
+    def __init__(self, source_root, cache_dir=None, widths=WIDTHS):
+        self.source_root = source_root
+        self.cache_dir = cache_dir or os.environ.get('IMAGE_CACHE_DIR') or DEFAULT_CACHE_DIR
+        self.widths = widths
+        self._hashes = OrderedDict()
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return Image is not None
+
+    def source_hash(self, image):
+        """Hash of a source image, re-read only when its size or mtime changes
+
+        None unless image names a file directly in source_root.
+        """
+        if not _is_source_name(image):
+            return None
+        path = os.path.join(self.source_root, image)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._hashes.get(image)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        with open(path, 'rb') as stream:
+            digest = hashlib.file_digest(stream, lambda: hashlib.blake2b(digest_size=6)).hexdigest()
+        with self._lock:
+            self._hashes[image] = (stat.st_mtime_ns, stat.st_size, digest)
+            self._hashes.move_to_end(image)
+            while len(self._hashes) > MAX_HASHES:
+                self._hashes.popitem(last=False)
+        return digest
+
+    def variants(self, image, url_prefix):
+        """srcsets for one catalog image, or None when it has no source file
+
+        {'src': original URL, 'webp': srcset, 'jpg': srcset}; only 'src'
+        when Pillow is not installed.
+        """
+        if not image or not image.lower().endswith(SOURCE_EXTENSIONS):
+            return None
+        digest = self.source_hash(image)
+        if digest is None:
+            return None
+
+        entry = {'src': f'/static/{image}'}
+        if self.enabled:
+            stem = os.path.splitext(image)[0]
+            for ext in FORMATS:
+                entry[ext] = ', '.join(
+                    f'{url_prefix}/{stem}-{digest}-{width}.{ext} {width}w' for width in self.widths
+                )
+        return entry
+
+    def derivative(self, name):
+        """Path of a derivative file, generating it if needed; None if the name is stale or unknown"""
+        match = _DERIVATIVE_NAME.match(name)
+        if not self.enabled or not match or match.group('ext') not in FORMATS:
+            return None
+        width = int(match.group('width'))
+        if width not in self.widths:
+            return None
+
+        image = self._source_for(match.group('stem'))
+        if image is None or self.source_hash(image) != match.group('hash'):
+            return None
+
+        path = os.path.join(self.cache_dir, name)
+        if not os.path.exists(path):
+            with self._lock:
+                lock = self._locks.setdefault(name, threading.Lock())
+            with lock:
+                if not os.path.exists(path):
+                    self._generate(image, path, width, match.group('ext'))
+        return path
+
+    def _source_for(self, stem):
+        if not _is_source_name(stem):
+            return None
+        for ext in SOURCE_EXTENSIONS:
+            if os.path.exists(os.path.join(self.source_root, stem + ext)):
+                return stem + ext
+        return None
+
+    def _generate(self, image, path, width, ext):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        pil_format, options = FORMATS[ext]
+        with Image.open(os.path.join(self.source_root, image)) as source:
+            source = source.convert('RGB')
+            # Never upscale; keep the aspect ratio
+            if source.width > width:
+                source = source.resize((width, round(source.height * width / source.width)), Image.LANCZOS)
+            handle, temporary = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            try:
+                with os.fdopen(handle, 'wb') as stream:
+                    source.save(stream, pil_format, **options)
+                os.replace(temporary, path)
+            except BaseException:
+                os.unlink(temporary)
+                raise
+        self._prune(image, path, width, ext)
+
+    def _prune(self, image, current, width, ext):
+        """Remove this size's derivatives of older versions of the source"""
+        stem = os.path.splitext(image)[0]
+        for filename in os.listdir(self.cache_dir):
+            match = _DERIVATIVE_NAME.match(filename)
+            if (match and match.group('stem') == stem and int(match.group('width')) == width
+                    and match.group('ext') == ext and filename != os.path.basename(current)):
+                try:
+                    os.unlink(os.path.join(self.cache_dir, filename))
+                except OSError:
+                    pass
@@ -0,0 +1,118 @@
+from datetime import datetime
+from sqlalchemy import and_, case, select, update
+from src.models.user import db
+from src.models.product import Game, Accessory
+from src.models.inventory import InventoryMovement
+
+# Cart item 'type' values and the tables they refer to
+PRODUCT_MODELS = {'game': Game, 'accessory': Accessory}
+
+
+class InventoryError(Exception):
+    """A cart line cannot be reserved"""
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+def _quantities(items):
+    """Total quantity per (type, id), sorted so concurrent checkouts lock rows in the same order"""
+    quantities = {}
+    for item in items:
+        if item.product_type not in PRODUCT_MODELS or item.product_id is None:
+            raise InventoryError(f'المنتج {item.name} غير موجود')
+        try:
+            quantity = int(item.quantity)
+        except (TypeError, ValueError):
+            quantity = 0
+        if quantity <= 0:
+            raise InventoryError(f'كمية غير صحيحة للمنتج {item.name}')
+        key = (item.product_type, item.product_id)
+        quantities[key] = quantities.get(key, 0) + quantity
+    return sorted(quantities.items())
+
+
+def _take(product_type, product_id, quantity):
+    """Atomically take quantity units of a product if that many are available
+
+    The availability check and the decrement are one guarded UPDATE, so two
+    checkouts can never both take the last unit, on SQLite or PostgreSQL,
+    and no lock is held across a read. Returns True when stock was taken,
+    None when the product does not track stock and False when it is short.
+    """
+    model = PRODUCT_MODELS[product_type]
+    result = db.session.execute(
+        update(model)
+        # Products an admin took off sale are not sold, whatever their stock
+        .where(model.id == product_id, model.in_stock.is_(True), model.stock_quantity >= quantity)
+        .values(
+            stock_quantity=model.stock_quantity - quantity,
+            # Computed from the old quantity: goes off sale when the last unit
+            # is taken, and never back on sale here
+            in_stock=and_(model.in_stock, model.stock_quantity > quantity),
+            updated_at=datetime.utcnow()
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        return True
+
+    # Nothing updated: short of stock, untracked or unknown
+    row = db.session.execute(
+        select(model.stock_quantity, model.in_stock).where(model.id == product_id)
+    ).first()
+    if row is None:
+        return False
+    stock_quantity, in_stock = row
+    if stock_quantity is None and in_stock:
+        return None
+    return False
+
+
+def reserve(order):
+    """Reserve stock for every line of an order within the caller's transaction
+
+    Raises InventoryError on the first line that cannot be covered; the
+    caller rolls back, which also returns the lines already taken.
+    """
+    names = {(item.product_type, item.product_id): item.name for item in order.items}
+    for (product_type, product_id), quantity in _quantities(order.items):
+        taken = _take(product_type, product_id, quantity)
+        if taken is False:
+            raise InventoryError(f'الكمية المطلوبة من {names[(product_type, product_id)]} غير متوفرة')
+        if taken:
+            db.session.add(InventoryMovement(
+                product_type=product_type, product_id=product_id,
+                order_id=order.id, delta=-quantity, reason='reserve'
+            ))
+
+
+def release(order):
+    """Return an order's reserved stock, e.g. when it is cancelled"""
+    movements = InventoryMovement.query.filter_by(order_id=order.id).all()
+    outstanding = {}
+    for movement in movements:
+        key = (movement.product_type, movement.product_id)
+        outstanding[key] = outstanding.get(key, 0) + movement.delta
+
+    for (product_type, product_id), delta in sorted(outstanding.items()):
+        if delta >= 0:
+            continue
+        model = PRODUCT_MODELS[product_type]
+        db.session.execute(
+            update(model)
+            .where(model.id == product_id, model.stock_quantity.isnot(None))
+            .values(
+                stock_quantity=model.stock_quantity - delta,
+                # Back on sale only if running out took it off; a product
+                # an admin pulled with stock left stays pulled
+                in_stock=case((model.stock_quantity == 0, True), else_=model.in_stock),
+                updated_at=datetime.utcnow()
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.add(InventoryMovement(
+            product_type=product_type, product_id=product_id,
+            order_id=order.id, delta=-delta, reason='release'
+        ))
@@ -0,0 +1,45 @@
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library encoder is used instead
+    orjson = None
+
+
+class JSONProvider(DefaultJSONProvider):
+    """jsonify() output as raw UTF-8, encoded by orjson when it is installed
+
+    Arabic names and messages are written as UTF-8 instead of \\uXXXX
+    escapes, which take six bytes per character. orjson produces the same
+    JSON as the standard library here: dates, decimals and UUIDs still go
+    through Flask's default() so they are formatted as before, and anything
+    orjson cannot encode (e.g. integers beyond 64 bits) falls back to the
+    standard library.
+    """
+    ensure_ascii = False
+
+    def _orjson_dumps(self, obj):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=self.default, option=options)
+        except orjson.JSONEncodeError:
+            return None
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        body = self._orjson_dumps(obj)
+        return super().dumps(obj) if body is None else body.decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        # Indented output (debug mode) is left to the standard library
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        if orjson is None or pretty:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = self._orjson_dumps(obj)
+        if body is None:
+            body = super().dumps(obj)
+        return self._app.response_class(body, mimetype=self.mimetype)
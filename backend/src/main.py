@@ -1,62 +1,175 @@
 import os
 import sys
+import time
 # DON'T CHANGE THIS !!!
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
-from flask import Flask, send_from_directory, jsonify
+_import_started = time.perf_counter()
+
+from flask import Flask, jsonify
 from flask_cors import CORS
 from src.models.user import db
+from src.db_config import database_url, engine_options
+from src.notifications import start_worker
+from src.carts import start_sweeper
 from src.routes.user import user_bp
-from src.routes.games import games_bp
-from src.routes.accessories import accessories_bp
+from src.routes.games import games_bp, games_catalog
+from src.routes.accessories import accessories_bp, accessories_catalog
 from src.routes.orders import orders_bp
+from src.routes.search import search_bp
+from src.routes.cart import cart_bp
+from src.routes.images import images_bp
+from src.catalog_io import catalog_cli
+from src.assets import AssetManifest
+from src.auth import UserCache
+from src.cache import ResponseCache
+from src.images import ImagePipeline
+from src.storefront import Storefront
+from src.throttle import LoginThrottle
+from src.json_provider import JSONProvider
+from src.compression import compress_response
+from src import metrics, query_profiler
+from src import migrations
+
+IMPORT_MS = (time.perf_counter() - _import_started) * 1000
+
+STATIC_FOLDER = os.path.join(os.path.dirname(__file__), 'static')
+
+
+def create_app(config=None):
+    """Build the Flask app without touching the database
+
+    The catalog is loaded by warm_up(), or by the first request that needs
+    it, and background threads by start_background(); see gunicorn.conf.py
+    for how they are split between the preloading parent and its workers.
+    """
+    started = time.perf_counter()
+    # Static files are served by the asset manifest below, not Flask's static route
+    app = Flask(__name__, static_folder=None)
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'gaming_store_secret_key_2024')
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url()
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Set to False to run without the Telegram worker and cart sweeper threads
+    app.config['BACKGROUND_WORKERS'] = True
+    # Log slow and repeated SQL statements (see src/query_profiler.py)
+    app.config['SQL_PROFILE'] = os.environ.get('SQL_PROFILE') == '1'
+    if config:
+        app.config.update(config)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config['SQLALCHEMY_DATABASE_URI']))
+    # UTF-8 JSON (orjson when installed) and gzip for large responses
+    app.json = JSONProvider(app)
+    app.after_request(compress_response)
+
+    # Enable CORS for all routes
+    CORS(app)
+
+    # Request, query and Telegram timings for /api/metrics; before the
+    # blueprints so their own before_request hooks are timed too
+    metrics.instrument(app)
+    if app.config['SQL_PROFILE']:
+        query_profiler.enable(app)
+
+    # In-memory state belongs to the app, so apps on different databases
+    # never serve each other's catalog or users
+    storefront = Storefront(games_catalog(), accessories_catalog())
+    app.extensions['storefront'] = storefront
+    app.extensions['response_cache'] = ResponseCache()
+    app.extensions['user_cache'] = UserCache()
+    app.extensions['login_throttle'] = LoginThrottle()
+    app.extensions['image_pipeline'] = ImagePipeline(app.config.get('STATIC_FOLDER', STATIC_FOLDER))
+    # Each worker picks up catalog changes made by other processes
+    app.before_request(storefront.refresh_if_stale)
+
+    # Register blueprints
+    app.register_blueprint(user_bp, url_prefix='/api')
+    app.register_blueprint(games_bp, url_prefix='/api')
+    app.register_blueprint(accessories_bp, url_prefix='/api')
+    app.register_blueprint(orders_bp, url_prefix='/api')
+    app.register_blueprint(search_bp, url_prefix='/api')
+    app.register_blueprint(cart_bp, url_prefix='/api')
+    app.register_blueprint(images_bp, url_prefix='/api')
+
+    db.init_app(app)
+
+    # flask catalog import/export and flask db upgrade
+    app.cli.add_command(catalog_cli)
+    app.cli.add_command(migrations.migrations_cli)
+
+    # Servers that never call start_background get the threads on the first request
+    @app.before_request
+    def ensure_background():
+        start_background(app)
+
+    # API Health Check
+    @app.route('/api/health')
+    def health_check():
+        return jsonify({
+            'status': 'healthy',
+            'message': 'Gaming Store API is running',
+            'version': '1.0.0',
+            'startup_ms': app.extensions['startup_ms']
+        })
+
+    # Prometheus scrape target
+    @app.route('/api/metrics')
+    def metrics_endpoint():
+        body, content_type = metrics.exposition()
+        return body, 200, {'Content-Type': content_type}
+
+    # Pre-compressed, fingerprinted copies of the storefront files
+    assets = AssetManifest(app.config.get('STATIC_FOLDER', STATIC_FOLDER))
+    app.extensions['assets'] = assets
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        return assets.serve(path)
+
+    app.extensions['startup_ms'] = {
+        'imports': round(IMPORT_MS, 1),
+        'create_app': round((time.perf_counter() - started) * 1000, 1),
+        'warm_up': None
+    }
+    return app
+
+
+def warm_up(app):
+    """Build the static asset manifest and load the catalog indexes now
+    instead of on the first requests that need them"""
+    started = time.perf_counter()
+    app.extensions['assets'].build()
+    with app.app_context():
+        # The schema is created and changed by 'flask db upgrade', not at startup
+        if not migrations.is_current():
+            app.logger.warning('Database schema is out of date; run "flask --app src/main.py db upgrade"')
+            return
+        app.extensions['storefront'].load()
+        # Connections opened here must not be shared with forked workers
+        db.engine.dispose()
+    app.extensions['startup_ms']['warm_up'] = round((time.perf_counter() - started) * 1000, 1)
+
+
+def start_background(app):
+    """Start this process's background threads; safe to call repeatedly"""
+    if not app.config['BACKGROUND_WORKERS']:
+        return
+    # Deliver queued Telegram notifications in the background
+    start_worker(app)
+    # Remove expired server-side carts
+    start_sweeper(app)
+
+
+def stop_background(app):
+    """Stop this process's background threads; gunicorn calls it as a worker exits"""
+    for name in ('notification_worker', 'cart_sweeper'):
+        thread = app.extensions.get(name)
+        if thread is not None:
+            thread.stop()
+
 
-app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
-app.config['SECRET_KEY'] = 'gaming_store_secret_key_2024'
-
-# Enable CORS for all routes
-CORS(app)
-
-# Register blueprints
-app.register_blueprint(user_bp, url_prefix='/api')
-app.register_blueprint(games_bp, url_prefix='/api')
-app.register_blueprint(accessories_bp, url_prefix='/api')
-app.register_blueprint(orders_bp, url_prefix='/api')
-
-# Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-db.init_app(app)
-with app.app_context():
-    db.create_all()
-
-# API Health Check
-@app.route('/api/health')
-def health_check():
-    return jsonify({
-        'status': 'healthy',
-        'message': 'Gaming Store API is running',
-        'version': '1.0.0'
-    })
-
-@app.route('/', defaults={'path': ''})
-@app.route('/<path:path>')
-def serve(path):
-    static_folder_path = app.static_folder
-    if static_folder_path is None:
-            return "Static folder not configured", 404
-
-    if path != "" and os.path.exists(os.path.join(static_folder_path, path)):
-        return send_from_directory(static_folder_path, path)
-    elif path.startswith("static/") and os.path.exists(os.path.join(static_folder_path, path.replace("static/", ""))):
-        return send_from_directory(static_folder_path, path.replace("static/", ""))
-    else:
-        index_path = os.path.join(static_folder_path, 'index.html')
-        if os.path.exists(index_path):
-            return send_from_directory(static_folder_path, 'index.html')
-        else:
-            return "index.html not found", 404
+app = create_app()
 
 
 if __name__ == '__main__':
+    warm_up(app)
     app.run(host='0.0.0.0', port=5000, debug=True)
@@ -0,0 +1,127 @@
+import os
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess
+    )
+except ImportError:  # optional; without it nothing is recorded and /api/metrics is empty
+    Histogram = None
+
+# Set by gunicorn.conf.py; each worker then writes its samples to files in
+# this directory and a scrape of any worker adds up all of them
+MULTIPROCESS_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+# Requests that match no route share one label instead of one per URL
+UNMATCHED = 'unmatched'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+if Histogram is not None:
+    REQUEST_SECONDS = Histogram(
+        'http_request_duration_seconds', 'Time to handle a request',
+        ('blueprint', 'endpoint', 'method'), buckets=LATENCY_BUCKETS
+    )
+    REQUESTS = Counter(
+        'http_requests', 'Requests handled, by response status',
+        ('blueprint', 'endpoint', 'method', 'status')
+    )
+    IN_PROGRESS = Gauge(
+        'http_requests_in_progress', 'Requests being handled right now',
+        multiprocess_mode='livesum'
+    )
+    QUERIES_PER_REQUEST = Histogram(
+        'db_queries_per_request', 'SQL statements run while handling a request',
+        ('blueprint', 'endpoint'), buckets=QUERY_COUNT_BUCKETS
+    )
+    QUERY_SECONDS_PER_REQUEST = Histogram(
+        'db_query_duration_seconds_per_request', 'Time spent in SQL while handling a request',
+        ('blueprint', 'endpoint'), buckets=LATENCY_BUCKETS
+    )
+    TELEGRAM_SEND_SECONDS = Histogram(
+        'telegram_send_duration_seconds', 'Time for one Telegram sendMessage call',
+        ('outcome',), buckets=LATENCY_BUCKETS
+    )
+
+
+def enabled():
+    return Histogram is not None
+
+
+def _labels():
+    endpoint = request.endpoint or UNMATCHED
+    return request.blueprint or '', endpoint
+
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+    g.db_queries = 0
+    g.db_query_seconds = 0.0
+    g.metrics_in_progress = True
+    IN_PROGRESS.inc()
+
+
+def _after_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    blueprint, endpoint = _labels()
+    REQUEST_SECONDS.labels(blueprint, endpoint, request.method).observe(time.perf_counter() - started)
+    REQUESTS.labels(blueprint, endpoint, request.method, str(response.status_code)).inc()
+    QUERIES_PER_REQUEST.labels(blueprint, endpoint).observe(g.db_queries)
+    QUERY_SECONDS_PER_REQUEST.labels(blueprint, endpoint).observe(g.db_query_seconds)
+    return response
+
+
+def _teardown_request(exception):
+    # Paired with the increment even when the request failed before after_request
+    if g.pop('metrics_in_progress', False):
+        IN_PROGRESS.dec()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    # Background threads run queries too, but only requests are measured
+    if has_request_context() and 'db_queries' in g:
+        g.db_queries += 1
+        g.db_query_seconds += time.perf_counter() - started
+
+
+def instrument(app):
+    """Record request, query and Telegram metrics for app
+
+    Call before registering blueprints, so the timing starts ahead of
+    their before_request hooks (such as the catalog refresh).
+    """
+    if not enabled():
+        return
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+
+
+def observe_telegram_send(seconds, outcome):
+    """Record one Telegram API call; outcome is 'ok', 'rate_limited' or 'error'"""
+    if enabled():
+        TELEGRAM_SEND_SECONDS.labels(outcome).observe(seconds)
+
+
+def exposition():
+    """(body, content type) in the Prometheus text format, summed over all workers"""
+    if not enabled():
+        return b'', 'text/plain; version=0.0.4; charset=utf-8'
+    if MULTIPROCESS_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,103 @@
+import importlib
+import os
+import re
+from datetime import datetime
+import click
+from flask.cli import AppGroup
+from sqlalchemy import Column, DateTime, Integer, String, Table, func, inspect, insert, select
+from src.models.user import db
+
+# One row per applied migration
+schema_version = Table(
+    'schema_version', db.metadata,
+    Column('version', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+VERSIONS_DIR = os.path.join(os.path.dirname(__file__), 'versions')
+_SCRIPT_NAME = re.compile(r'^(\d{4})_(\w+)\.py$')
+
+
+def migrations():
+    """(version, name, module) for every script in versions/, in order
+
+    Scripts are named NNNN_description.py and define upgrade(connection).
+    """
+    found = []
+    for filename in os.listdir(VERSIONS_DIR):
+        match = _SCRIPT_NAME.match(filename)
+        if match:
+            module = importlib.import_module(f'{__name__}.versions.{filename[:-3]}')
+            found.append((int(match.group(1)), match.group(2), module))
+    return sorted(found, key=lambda migration: migration[0])
+
+
+def current_version(connection):
+    if not inspect(connection).has_table('schema_version'):
+        return 0
+    return connection.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def pending():
+    with db.engine.connect() as connection:
+        version = current_version(connection)
+    return [migration for migration in migrations() if migration[0] > version]
+
+
+def is_current():
+    """True when every migration has been applied; one small query"""
+    return not pending()
+
+
+def upgrade(target=None, echo=print):
+    """Apply pending migrations up to target, each in its own transaction"""
+    applied = 0
+    for version, name, module in pending():
+        if target is not None and version > target:
+            break
+        with db.engine.connect() as connection:
+            sqlite = connection.dialect.name == 'sqlite'
+            # Rebuilding a table that others reference would fire their ON
+            # DELETE rules; SQLite only switches them off outside a transaction
+            if sqlite:
+                connection.exec_driver_sql('PRAGMA foreign_keys=OFF')
+                connection.commit()
+            try:
+                with connection.begin():
+                    module.upgrade(connection)
+                    schema_version.create(connection, checkfirst=True)
+                    connection.execute(insert(schema_version).values(
+                        version=version, name=name, applied_at=datetime.utcnow()
+                    ))
+            finally:
+                if sqlite:
+                    connection.exec_driver_sql('PRAGMA foreign_keys=ON')
+                    connection.commit()
+        echo(f'Applied migration {version:04d} {name}')
+        applied += 1
+    return applied
+
+
+migrations_cli = AppGroup('db', help='Database schema migrations.')
+
+
+@migrations_cli.command('upgrade')
+@click.option('--to', 'target', type=int, help='Stop after this version.')
+def upgrade_command(target):
+    """Apply pending schema migrations"""
+    applied = upgrade(target, echo=click.echo)
+    click.echo(f'Database is at version {_version()} ({applied} applied)')
+
+
+@migrations_cli.command('current')
+def current_command():
+    """Show the schema version and any pending migrations"""
+    click.echo(f'Database is at version {_version()}')
+    for version, name, _ in pending():
+        click.echo(f'Pending: {version:04d} {name}')
+
+
+def _version():
+    with db.engine.connect() as connection:
+        return current_version(connection)
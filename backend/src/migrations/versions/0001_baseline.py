@@ -0,0 +1,152 @@
+"""Create the schema as it was when migrations were introduced
+
+The tables are spelled out here rather than taken from the models, so
+replaying this migration always builds the same schema; later changes
+belong in later migrations. Databases created before migrations existed
+keep their data: missing tables are added and the early user table (no
+password or phone columns, unique usernames) is rebuilt in this shape.
+"""
+from sqlalchemy import (
+    JSON, Boolean, Column, Date, DateTime, Float, ForeignKey, Index, Integer, MetaData, String, Table, Text,
+    inspect, text
+)
+
+metadata = MetaData()
+
+user = Table(
+    'user', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('username', String(80), nullable=False),
+    Column('email', String(120), unique=True, nullable=False),
+    Column('password_hash', String(255), nullable=False),
+    Column('phone', String(20)),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime)
+)
+
+
+def _product_columns():
+    return [
+        Column('id', Integer, primary_key=True),
+        Column('sku', String(64), nullable=False, unique=True, index=True),
+        Column('name', String(200), nullable=False),
+        Column('price', Float, nullable=False),
+        Column('category', String(50), nullable=False, index=True),
+        Column('description', Text),
+        Column('image', String(255)),
+        Column('rating', Float, nullable=False),
+        Column('in_stock', Boolean, nullable=False),
+        Column('stock_quantity', Integer),
+        Column('created_at', DateTime),
+        Column('updated_at', DateTime, index=True)
+    ]
+
+
+Table(
+    'games', metadata,
+    Column('platform', JSON, nullable=False),
+    *_product_columns()
+)
+
+Table(
+    'accessories', metadata,
+    Column('brand', String(80), index=True),
+    Column('features', JSON, nullable=False),
+    *_product_columns()
+)
+
+Table(
+    'orders', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('order_number', String(20), unique=True, index=True),
+    Column('user_id', Integer, ForeignKey('user.id', ondelete='SET NULL')),
+    Column('customer_name', String(120), nullable=False),
+    Column('customer_email', String(120), nullable=False),
+    Column('customer_phone', String(20), nullable=False),
+    Column('customer_address', Text),
+    Column('total_amount', Float, nullable=False),
+    Column('status', String(20), nullable=False),
+    Column('payment_method', String(40), nullable=False),
+    Column('notes', Text),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime),
+    Index('ix_orders_created_at_id', 'created_at', 'id'),
+    Index('ix_orders_status_created_at_id', 'status', 'created_at', 'id'),
+    Index('ix_orders_user_id_created_at_id', 'user_id', 'created_at', 'id')
+)
+
+Table(
+    'order_items', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('order_id', Integer, ForeignKey('orders.id', ondelete='CASCADE'), nullable=False, index=True),
+    Column('product_type', String(20)),
+    Column('product_id', Integer),
+    Column('name', String(200), nullable=False),
+    Column('price', Float, nullable=False),
+    Column('quantity', Integer, nullable=False)
+)
+
+Table(
+    'order_daily_stats', metadata,
+    Column('day', Date, primary_key=True),
+    Column('status', String(20), primary_key=True),
+    Column('order_count', Integer, nullable=False),
+    Column('amount_sum', Float, nullable=False)
+)
+
+Table(
+    'inventory_ledger', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('product_type', String(20), nullable=False),
+    Column('product_id', Integer, nullable=False),
+    Column('order_id', Integer, ForeignKey('orders.id', ondelete='CASCADE'), index=True),
+    Column('delta', Integer, nullable=False),
+    Column('reason', String(20), nullable=False),
+    Column('created_at', DateTime),
+    Index('ix_inventory_ledger_product', 'product_type', 'product_id')
+)
+
+Table(
+    'notification_outbox', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('chat_id', String(64), nullable=False),
+    Column('kind', String(20), nullable=False),
+    Column('payload', Text, nullable=False),
+    Column('status', String(10), nullable=False),
+    Column('attempts', Integer, nullable=False),
+    Column('next_attempt_at', DateTime, nullable=False),
+    Column('last_error', Text),
+    Column('created_at', DateTime),
+    Column('sent_at', DateTime),
+    Index('ix_notification_outbox_status_next_attempt_at', 'status', 'next_attempt_at')
+)
+
+Table(
+    'carts', metadata,
+    Column('id', String(32), primary_key=True),
+    Column('user_id', Integer, ForeignKey('user.id', ondelete='CASCADE'), unique=True),
+    Column('items', Text, nullable=False),
+    Column('expires_at', DateTime, nullable=False, index=True),
+    Column('created_at', DateTime),
+    Column('updated_at', DateTime)
+)
+
+
+def upgrade(connection):
+    inspector = inspect(connection)
+    if inspector.has_table('user'):
+        columns = {column['name'] for column in inspector.get_columns('user')}
+        if 'password_hash' not in columns:
+            _rebuild_legacy_user_table(connection, columns)
+    metadata.create_all(bind=connection)
+
+
+def _rebuild_legacy_user_table(connection, columns):
+    connection.execute(text('ALTER TABLE "user" RENAME TO user_legacy'))
+    user.create(connection)
+    kept = ', '.join(name for name in ('id', 'username', 'email', 'phone', 'created_at', 'updated_at') if name in columns)
+    # Legacy accounts have no password; they cannot log in until it is reset
+    connection.execute(text(
+        f'INSERT INTO "user" ({kept}, password_hash) SELECT {kept}, \'\' FROM user_legacy'
+    ))
+    connection.execute(text('DROP TABLE user_legacy'))
@@ -0,0 +1,6 @@
+"""Index users by lower(email) for case-insensitive lookups and by created_at for admin listings"""
+from sqlalchemy import text
+
+def upgrade(connection):
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_user_email_lower ON "user" (lower(email))'))
+    connection.execute(text('CREATE INDEX IF NOT EXISTS ix_user_created_at ON "user" (created_at)'))
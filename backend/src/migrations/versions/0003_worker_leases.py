@@ -0,0 +1,18 @@
+"""Add worker_leases, so one process at a time delivers Telegram notifications"""
+from datetime import datetime
+from sqlalchemy import Column, DateTime, MetaData, String, Table, insert
+
+metadata = MetaData()
+
+worker_leases = Table(
+    'worker_leases', metadata,
+    Column('name', String(40), primary_key=True),
+    Column('holder', String(64), nullable=False),
+    Column('expires_at', DateTime, nullable=False)
+)
+
+
+def upgrade(connection):
+    worker_leases.create(connection)
+    # Already expired, so the first worker to ask takes it
+    connection.execute(insert(worker_leases).values(name='telegram', holder='', expires_at=datetime(1970, 1, 1)))
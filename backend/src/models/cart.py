@@ -0,0 +1,20 @@
+from datetime import datetime
+from src.models.user import db
+
+class Cart(db.Model):
+    """A shopping cart kept on the server so it follows the customer across devices
+
+    items holds compact 'g1:2,a3:1' pairs (kind code, product id, quantity);
+    names and prices always come from the catalog.
+    """
+    __tablename__ = 'carts'
+
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=True, unique=True)
+    items = db.Column(db.Text, nullable=False, default='')
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<Cart {self.id}>'
@@ -0,0 +1,20 @@
+from datetime import datetime
+from src.models.user import db
+
+class InventoryMovement(db.Model):
+    """One stock change: a reservation for an order, or its release"""
+    __tablename__ = 'inventory_ledger'
+    __table_args__ = (
+        db.Index('ix_inventory_ledger_product', 'product_type', 'product_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    product_type = db.Column(db.String(20), nullable=False)
+    product_id = db.Column(db.Integer, nullable=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id', ondelete='CASCADE'), nullable=True, index=True)
+    delta = db.Column(db.Integer, nullable=False)
+    reason = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<InventoryMovement {self.product_type}:{self.product_id} {self.delta:+d}>'
@@ -0,0 +1,40 @@
+from datetime import datetime
+from src.models.user import db
+
+class Notification(db.Model):
+    """A Telegram message waiting in the outbox for background delivery"""
+    __tablename__ = 'notification_outbox'
+    # The delivery worker polls for due rows in these states
+    __table_args__ = (
+        db.Index('ix_notification_outbox_status_next_attempt_at', 'status', 'next_attempt_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    chat_id = db.Column(db.String(64), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)
+    payload = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(10), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<Notification {self.kind} {self.status}>'
+
+
+class WorkerLease(db.Model):
+    """Which process currently runs a singleton background job, and until when
+
+    A holder renews its lease while it works; once the lease runs out,
+    because its process died or hung, another process takes over.
+    """
+    __tablename__ = 'worker_leases'
+
+    name = db.Column(db.String(40), primary_key=True)
+    holder = db.Column(db.String(64), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f'<WorkerLease {self.name} {self.holder}>'
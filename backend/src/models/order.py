@@ -0,0 +1,90 @@
+from datetime import datetime
+from src.models.user import db
+
+class Order(db.Model):
+    __tablename__ = 'orders'
+    # Keyset pagination walks (created_at, id) newest first, optionally
+    # narrowed to one status or one customer
+    __table_args__ = (
+        db.Index('ix_orders_created_at_id', 'created_at', 'id'),
+        db.Index('ix_orders_status_created_at_id', 'status', 'created_at', 'id'),
+        db.Index('ix_orders_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    order_number = db.Column(db.String(20), unique=True, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='SET NULL'), nullable=True)
+    customer_name = db.Column(db.String(120), nullable=False)
+    customer_email = db.Column(db.String(120), nullable=False)
+    customer_phone = db.Column(db.String(20), nullable=False)
+    customer_address = db.Column(db.Text, nullable=True, default='')
+    total_amount = db.Column(db.Float, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    payment_method = db.Column(db.String(40), nullable=False, default='cash_on_delivery')
+    notes = db.Column(db.Text, nullable=True, default='')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    items = db.relationship('OrderItem', backref='order', cascade='all, delete-orphan', lazy='selectin')
+
+    def __repr__(self):
+        return f'<Order {self.order_number}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'order_number': self.order_number,
+            'user_id': self.user_id,
+            'customer_name': self.customer_name,
+            'customer_email': self.customer_email,
+            'customer_phone': self.customer_phone,
+            'customer_address': self.customer_address,
+            'items': [item.to_dict() for item in self.items],
+            'total_amount': self.total_amount,
+            'status': self.status,
+            'payment_method': self.payment_method,
+            'notes': self.notes,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class OrderItem(db.Model):
+    __tablename__ = 'order_items'
+
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id', ondelete='CASCADE'), nullable=False, index=True)
+    product_type = db.Column(db.String(20), nullable=True)
+    product_id = db.Column(db.Integer, nullable=True)
+    name = db.Column(db.String(200), nullable=False)
+    price = db.Column(db.Float, nullable=False, default=0)
+    quantity = db.Column(db.Integer, nullable=False, default=1)
+
+    def __repr__(self):
+        return f'<OrderItem {self.name} x{self.quantity}>'
+
+    def to_dict(self):
+        return {
+            'id': self.product_id,
+            'type': self.product_type,
+            'name': self.name,
+            'price': self.price,
+            'quantity': self.quantity
+        }
+
+
+class OrderDailyStats(db.Model):
+    """Running per-day, per-status order counts and amounts
+
+    Rows are bumped in the same transaction as the order change they
+    reflect, so reading stats never has to scan the orders table.
+    """
+    __tablename__ = 'order_daily_stats'
+
+    day = db.Column(db.Date, primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    amount_sum = db.Column(db.Float, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<OrderDailyStats {self.day} {self.status}>'
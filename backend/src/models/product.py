@@ -0,0 +1,65 @@
+from datetime import datetime
+from src.models.user import db
+
+def _number(value):
+    """Render whole prices and ratings as ints, as the catalog always has"""
+    return int(value) if value is not None and float(value).is_integer() else value
+
+class Product(db.Model):
+    """Columns shared by every kind of product; each kind has its own table"""
+    __abstract__ = True
+
+    id = db.Column(db.Integer, primary_key=True)
+    sku = db.Column(db.String(64), unique=True, nullable=False, index=True)
+    name = db.Column(db.String(200), nullable=False)
+    price = db.Column(db.Float, nullable=False)
+    category = db.Column(db.String(50), nullable=False, index=True)
+    description = db.Column(db.Text, nullable=True, default='')
+    image = db.Column(db.String(255), nullable=True)
+    rating = db.Column(db.Float, nullable=False, default=0)
+    in_stock = db.Column(db.Boolean, nullable=False, default=True)
+    # Units available for sale; NULL means stock is not tracked for the product
+    stock_quantity = db.Column(db.Integer, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Workers poll this to pick up catalog changes made elsewhere
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<{type(self).__name__} {self.sku}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'sku': self.sku,
+            'name': self.name,
+            'price': _number(self.price),
+            'category': self.category,
+            'description': self.description,
+            'image': self.image,
+            'rating': self.rating,
+            'in_stock': self.in_stock
+        }
+
+
+class Game(Product):
+    __tablename__ = 'games'
+
+    platform = db.Column(db.JSON, nullable=False, default=list)
+
+    def to_dict(self):
+        data = super().to_dict()
+        data['platform'] = list(self.platform or [])
+        return data
+
+
+class Accessory(Product):
+    __tablename__ = 'accessories'
+
+    brand = db.Column(db.String(80), nullable=True, index=True)
+    features = db.Column(db.JSON, nullable=False, default=list)
+
+    def to_dict(self):
+        data = super().to_dict()
+        data['brand'] = self.brand
+        data['features'] = list(self.features or [])
+        return data
@@ -4,6 +4,10 @@ from datetime import datetime
 db = SQLAlchemy()
 
 class User(db.Model):
+    # Ids are never reused, so a new account cannot inherit a deleted one's
+    # orders or tokens (SQLite reuses rowids otherwise; see migration 0004)
+    __table_args__ = {'sqlite_autoincrement': True}
+
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
@@ -12,6 +16,8 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # Indexed on lower(email) and created_at by migration 0002
+
     def __repr__(self):
         return f'<User {self.username}>'
 
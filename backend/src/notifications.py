@@ -0,0 +1,325 @@
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import or_, update
+from src.models.user import db
+from src.models.notification import Notification, WorkerLease
+from src.metrics import observe_telegram_send
+from src.telegram_bot import get_telegram_bot, TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, TIME_FORMAT
+
+MAX_ATTEMPTS = 8
+# A claimed message is retried by any worker once its lease runs out
+CLAIM_LEASE = timedelta(minutes=2)
+BATCH_SIZE = 100
+POLL_INTERVAL = 1.0
+# Telegram allows about one message per second per chat and 30 per second overall
+PER_CHAT_INTERVAL = 1.0
+GLOBAL_RATE = 30
+# Only the process holding this lease sends, so the limits above hold for the
+# whole deployment; a holder that dies is replaced once its lease runs out
+LEASE_NAME = 'telegram'
+LEASE_DURATION = timedelta(seconds=30)
+# How often processes without the lease check whether it has run out
+LEASE_RETRY_INTERVAL = 5.0
+# Seconds a stopping worker waits for the message being sent
+STOP_TIMEOUT = 10.0
+# Seconds to coalesce order notifications into one digest message (0 = off);
+# worth turning on for flash sales when orders arrive in bursts
+DIGEST_INTERVAL = int(os.environ.get('TELEGRAM_DIGEST_INTERVAL', '0'))
+
+
+def is_configured():
+    return TELEGRAM_BOT_TOKEN != "YOUR_BOT_TOKEN_HERE" and TELEGRAM_CHAT_ID != "YOUR_CHAT_ID_HERE"
+
+
+def enqueue(kind, payload, chat_id=None):
+    """Add a notification to the outbox in the caller's transaction
+
+    Nothing is sent here; the message becomes visible to the delivery worker
+    when the caller commits, so it goes out only if the change it announces
+    was saved. Returns None when Telegram is not configured.
+    """
+    if not is_configured():
+        return None
+
+    payload = dict(payload, created_at=datetime.now().strftime(TIME_FORMAT))
+    notification = Notification(
+        chat_id=chat_id or TELEGRAM_CHAT_ID,
+        kind=kind,
+        payload=json.dumps(payload, ensure_ascii=False),
+        next_attempt_at=digest_due_at() if DIGEST_INTERVAL and kind == 'order' else datetime.utcnow()
+    )
+    db.session.add(notification)
+    return notification
+
+
+def digest_due_at():
+    """End of the current digest window
+
+    Windows are aligned to the clock, so every worker process holds back
+    orders until the same moment and they are claimed together.
+    """
+    now = datetime.utcnow()
+    elapsed = (now - datetime(now.year, now.month, now.day)).total_seconds()
+    return now + timedelta(seconds=DIGEST_INTERVAL - elapsed % DIGEST_INTERVAL)
+
+
+def render(bot, notification):
+    payload = json.loads(notification.payload)
+    formatters = {
+        'order': bot.format_order_notification,
+        'contact': bot.format_contact_message,
+        'registration': bot.format_user_registration_notification
+    }
+    return formatters[notification.kind](payload)
+
+
+def backoff(attempts):
+    """Exponential backoff with jitter: ~2s, 4s, 8s ... capped at an hour"""
+    delay = min(2 ** attempts, 3600)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+class RateLimiter:
+    """Spaces out sends per chat and caps the overall send rate"""
+
+    def __init__(self, per_chat_interval=PER_CHAT_INTERVAL, global_rate=GLOBAL_RATE):
+        self.per_chat_interval = per_chat_interval
+        self.global_interval = 1.0 / global_rate
+        self._next_for_chat = {}
+        self._next_global = 0.0
+
+    def wait(self, chat_id):
+        now = time.monotonic()
+        ready_at = max(self._next_for_chat.get(chat_id, 0.0), self._next_global)
+        if ready_at > now:
+            time.sleep(ready_at - now)
+            now = ready_at
+        self._next_for_chat[chat_id] = now + self.per_chat_interval
+        self._next_global = now + self.global_interval
+
+    def defer(self, chat_id, seconds):
+        """Hold a chat back after Telegram answered 429 Too Many Requests"""
+        self._next_for_chat[chat_id] = time.monotonic() + seconds
+
+
+class NotificationWorker(threading.Thread):
+    """Background thread delivering outbox notifications to Telegram
+
+    Every gunicorn worker runs one of these, but only the one holding the
+    'telegram' lease in worker_leases sends; the rest wait to take over.
+    One sender means one RateLimiter, so each chat gets at most the
+    configured rate however many processes serve the site. Rows are still
+    claimed with a conditional UPDATE, so a handover never sends twice.
+    """
+
+    def __init__(self, app, bot=None, poll_interval=POLL_INTERVAL):
+        super().__init__(name='notification-worker', daemon=True)
+        self.app = app
+        self.bot = bot or get_telegram_bot()
+        self.poll_interval = poll_interval
+        self.limiter = RateLimiter()
+        self.holder = uuid.uuid4().hex
+        self._lease_until = None
+        self._stop_event = threading.Event()
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """Stop after the message being sent, handing the lease straight to another process"""
+        self._stop_event.set()
+        self.join(timeout)
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                with self.app.app_context():
+                    if not self.hold_lease():
+                        self._stop_event.wait(LEASE_RETRY_INTERVAL)
+                        continue
+                    delivered = self.run_once()
+            except Exception:
+                self.app.logger.exception('Notification worker error')
+                delivered = 0
+            if not delivered:
+                self._stop_event.wait(self.poll_interval)
+        self.release_lease()
+
+    def hold_lease(self):
+        """Take or renew the sending lease; True while this worker holds it
+
+        Renewed once half of it has run out rather than on every poll.
+        """
+        now = datetime.utcnow()
+        if self._lease_until is not None and now < self._lease_until - LEASE_DURATION / 2:
+            return True
+        result = db.session.execute(
+            update(WorkerLease)
+            .where(
+                WorkerLease.name == LEASE_NAME,
+                or_(WorkerLease.holder == self.holder, WorkerLease.expires_at < now)
+            )
+            .values(holder=self.holder, expires_at=now + LEASE_DURATION)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        self._lease_until = now + LEASE_DURATION if result.rowcount else None
+        return self._lease_until is not None
+
+    def release_lease(self):
+        if self._lease_until is None:
+            return
+        try:
+            with self.app.app_context():
+                db.session.execute(
+                    update(WorkerLease)
+                    .where(WorkerLease.name == LEASE_NAME, WorkerLease.holder == self.holder)
+                    .values(expires_at=datetime.utcnow())
+                    .execution_options(synchronize_session=False)
+                )
+                db.session.commit()
+        except Exception:
+            self.app.logger.exception('Could not release the notification lease')
+        self._lease_until = None
+
+    def claim_batch(self):
+        now = datetime.utcnow()
+        candidates = Notification.query.filter(
+            Notification.status.in_(('pending', 'sending')),
+            Notification.next_attempt_at <= now
+        ).order_by(Notification.next_attempt_at, Notification.id).limit(BATCH_SIZE).all()
+
+        claimed = []
+        for notification in candidates:
+            result = db.session.execute(
+                update(Notification)
+                .where(
+                    Notification.id == notification.id,
+                    Notification.status == notification.status,
+                    Notification.next_attempt_at == notification.next_attempt_at
+                )
+                .values(status='sending', next_attempt_at=now + CLAIM_LEASE)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                claimed.append(notification.id)
+        db.session.commit()
+
+        if not claimed:
+            return []
+        return Notification.query.filter(Notification.id.in_(claimed)).order_by(Notification.id).all()
+
+    def run_once(self):
+        """Claim and deliver one batch of due notifications; returns how many were sent"""
+        batch = self.claim_batch()
+
+        # In digest mode all order notifications that came due together for
+        # a chat go out as one message instead of one message each
+        groups = []
+        digests = {}
+        for notification in batch:
+            if DIGEST_INTERVAL and notification.kind == 'order':
+                if notification.chat_id not in digests:
+                    digests[notification.chat_id] = []
+                    groups.append(digests[notification.chat_id])
+                digests[notification.chat_id].append(notification)
+            else:
+                groups.append([notification])
+
+        delivered = 0
+        for group in groups:
+            # A digest too long for one message goes out as several, each
+            # marked sent on its own so a retry never repeats a sent part
+            parts = self.split_digest(group) if len(group) > 1 else [group]
+            for i, part in enumerate(parts):
+                # Sending a batch can outlast the lease; stop if another process
+                # took over, or this one is shutting down, leaving the rest to
+                # be sent once their claim runs out
+                if self._stop_event.is_set() or not self.hold_lease():
+                    db.session.commit()
+                    return delivered
+                if self.deliver(part):
+                    delivered += len(part)
+                    db.session.commit()
+                    continue
+                # The parts after a failed one wait for it rather than overtake it
+                for later in parts[i + 1:]:
+                    for notification in later:
+                        notification.status = 'pending'
+                        notification.next_attempt_at = part[0].next_attempt_at
+                db.session.commit()
+                break
+        return delivered
+
+    def split_digest(self, group):
+        """Split a digest group into groups whose digests each fit in one message"""
+        orders = self.bot.split_order_digest([json.loads(n.payload) for n in group])
+        parts = []
+        start = 0
+        for part in orders:
+            parts.append(group[start:start + len(part)])
+            start += len(part)
+        return parts
+
+    def render_group(self, group):
+        if len(group) == 1:
+            return render(self.bot, group[0])
+        return self.bot.format_order_digest([json.loads(n.payload) for n in group])
+
+    def send(self, chat_id, text):
+        """Send one message; returns (error, retry_in, permanent), error None on success"""
+        self.limiter.wait(chat_id)
+        started = time.perf_counter()
+        result = self.bot.send_message(chat_id, text)
+        elapsed = time.perf_counter() - started
+
+        if result and result.get('ok'):
+            observe_telegram_send(elapsed, 'ok')
+            return None, None, False
+        if result is None:
+            observe_telegram_send(elapsed, 'error')
+            return 'request failed', None, False
+        if result.get('error_code') == 429:
+            observe_telegram_send(elapsed, 'rate_limited')
+            retry_after = result.get('parameters', {}).get('retry_after', 1)
+            self.limiter.defer(chat_id, retry_after)
+            return result.get('description'), timedelta(seconds=retry_after), False
+
+        observe_telegram_send(elapsed, 'error')
+        # Other 4xx answers (bad chat id, malformed HTML) will not succeed on retry
+        code = result.get('error_code') or 0
+        return result.get('description'), None, 400 <= code < 500
+
+    def deliver(self, group):
+        """Send a notification, or a one-message digest of several; True when delivered"""
+        error, retry_in, permanent = self.send(group[0].chat_id, self.render_group(group))
+        for notification in group:
+            notification.attempts += 1
+            if not error:
+                notification.status = 'sent'
+                notification.sent_at = datetime.utcnow()
+                notification.last_error = None
+            elif permanent or notification.attempts >= MAX_ATTEMPTS:
+                notification.status = 'failed'
+                notification.last_error = error
+                self.app.logger.warning('Giving up on Telegram notification %s: %s', notification.id, error)
+            else:
+                notification.status = 'pending'
+                notification.last_error = error
+                notification.next_attempt_at = datetime.utcnow() + (retry_in or backoff(notification.attempts))
+        return error is None
+
+
+_start_lock = threading.Lock()
+
+
+def start_worker(app):
+    """Start app's delivery worker in this process if Telegram is configured"""
+    with _start_lock:
+        worker = app.extensions.get('notification_worker')
+        if worker is None and is_configured():
+            worker = app.extensions['notification_worker'] = NotificationWorker(app)
+            worker.start()
+    return worker
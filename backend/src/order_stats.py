@@ -0,0 +1,124 @@
+from datetime import date
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.order import Order, OrderDailyStats
+
+# Statuses whose order amounts count towards revenue
+REVENUE_STATUSES = ('confirmed', 'processing', 'shipped', 'delivered')
+
+GRANULARITIES = ('day', 'month')
+
+
+def _bump(day, status, count_delta, amount_delta):
+    values = {
+        'order_count': OrderDailyStats.order_count + count_delta,
+        'amount_sum': OrderDailyStats.amount_sum + amount_delta
+    }
+    result = db.session.execute(
+        update(OrderDailyStats)
+        .where(OrderDailyStats.day == day, OrderDailyStats.status == status)
+        .values(**values)
+    )
+    if result.rowcount:
+        return
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(OrderDailyStats(
+                day=day, status=status,
+                order_count=count_delta, amount_sum=amount_delta
+            ))
+    except IntegrityError:
+        # Another worker created the bucket first; add to theirs instead
+        db.session.execute(
+            update(OrderDailyStats)
+            .where(OrderDailyStats.day == day, OrderDailyStats.status == status)
+            .values(**values)
+        )
+
+
+def record_order_created(order):
+    """Count a newly flushed order in its creation-day bucket"""
+    _bump(order.created_at.date(), order.status, 1, order.total_amount)
+
+
+def record_status_change(order, old_status):
+    """Move an order between status buckets of its creation day"""
+    if old_status == order.status:
+        return
+    day = order.created_at.date()
+    _bump(day, old_status, -1, -order.total_amount)
+    _bump(day, order.status, 1, order.total_amount)
+
+
+def rebuild():
+    """Recompute every rollup row from the orders table"""
+    db.session.query(OrderDailyStats).delete()
+    day = func.date(Order.created_at)
+    rows = db.session.query(
+        day, Order.status, func.count(Order.id), func.sum(Order.total_amount)
+    ).group_by(day, Order.status).all()
+
+    for row_day, status, count, amount in rows:
+        # SQLite returns DATE() results as text
+        if isinstance(row_day, str):
+            row_day = date.fromisoformat(row_day)
+        db.session.add(OrderDailyStats(
+            day=row_day, status=status, order_count=count, amount_sum=amount or 0
+        ))
+    db.session.commit()
+    return len(rows)
+
+
+def _summarize(rows):
+    status_counts = {}
+    total_orders = 0
+    total_revenue = 0
+
+    for status, count, amount in rows:
+        if not count:
+            continue
+        status_counts[status] = status_counts.get(status, 0) + count
+        total_orders += count
+
+        if status in REVENUE_STATUSES:
+            total_revenue += amount or 0
+
+    return {
+        'total_orders': total_orders,
+        'total_revenue': total_revenue,
+        'status_breakdown': status_counts,
+        'average_order_value': total_revenue / max(total_orders, 1)
+    }
+
+
+def get_stats(start=None, end=None, granularity=None):
+    """Order statistics from the rollups, optionally windowed and bucketed
+
+    start and end are inclusive dates. With a granularity the result also
+    carries a 'series' of per-period summaries in chronological order.
+    """
+    query = db.session.query(
+        OrderDailyStats.day, OrderDailyStats.status,
+        OrderDailyStats.order_count, OrderDailyStats.amount_sum
+    )
+    if start:
+        query = query.filter(OrderDailyStats.day >= start)
+    if end:
+        query = query.filter(OrderDailyStats.day <= end)
+    rows = query.order_by(OrderDailyStats.day).all()
+
+    stats = _summarize((status, count, amount) for _, status, count, amount in rows)
+
+    if granularity:
+        periods = {}
+        for day, status, count, amount in rows:
+            period = day.isoformat() if granularity == 'day' else day.strftime('%Y-%m')
+            periods.setdefault(period, []).append((status, count, amount))
+        stats['series'] = [
+            {'period': period, **_summarize(period_rows)}
+            for period, period_rows in periods.items()
+        ]
+
+    return stats
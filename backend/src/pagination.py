@@ -0,0 +1,76 @@
+import base64
+import json
+from bisect import bisect_right
+from flask import request
+
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(*values):
+    """Opaque cursor for the sort key of the last item on a page"""
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Sort key values packed by encode_cursor; raises ValueError when malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError('invalid cursor') from e
+    if not isinstance(values, list) or not values:
+        raise ValueError('invalid cursor')
+    return values
+
+
+def page_args(default_limit=None):
+    """Read ?limit= and ?after= from the current request
+
+    Returns (limit, after) where after is the decoded cursor or None. A
+    missing limit falls back to default_limit (None meaning unpaginated).
+    Raises ValueError on a malformed cursor or non-positive limit.
+    """
+    limit = request.args.get('limit', type=int, default=default_limit)
+    if limit is not None:
+        if limit <= 0:
+            raise ValueError('invalid limit')
+        limit = min(limit, MAX_PAGE_SIZE)
+
+    after = request.args.get('after')
+    return limit, decode_cursor(after) if after else None
+
+
+def fetch_page(query, limit):
+    """Run a keyset-filtered, index-ordered query for one page
+
+    One extra row is fetched to tell whether another page follows, so no
+    COUNT or OFFSET is needed. Returns (rows, has_more).
+    """
+    rows = query.limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
+
+
+def _product_id(product):
+    return product['id']
+
+
+def slice_by_id(items, limit, after, key=_product_id):
+    """Keyset page over an in-memory list ordered by ascending id
+
+    items are products by default; pass key to page over other records
+    (e.g. key=int for a plain list of ids). Returns (page, next_cursor);
+    next_cursor is None on the last page. Raises ValueError when the
+    cursor does not hold an id.
+    """
+    start = 0
+    if after:
+        if not isinstance(after[0], int):
+            raise ValueError('invalid cursor')
+        start = bisect_right(items, after[0], key=key)
+    if limit is None:
+        return items[start:], None
+
+    page = items[start:start + limit]
+    has_more = start + limit < len(items)
+    return page, encode_cursor(key(page[-1])) if has_more else None
@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Werkzeug method string, e.g. 'scrypt:32768:8:1' or 'pbkdf2:sha256:600000';
+# run 'flask user calibrate-hash' to pick one for the server's CPU
+HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+# Hashing runs on a small pool so slow hashes cannot tie up every request thread
+HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+# Hashes queued beyond this wait up to QUEUE_TIMEOUT seconds, then are turned away
+MAX_PENDING = HASH_WORKERS * 4
+QUEUE_TIMEOUT = 2.0
+
+
+class HashingBusy(Exception):
+    """Too many password hashes are already queued"""
+
+
+_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix='password-hash')
+_pending = threading.BoundedSemaphore(MAX_PENDING)
+
+
+def _run(function, *args):
+    """Run a hashing call on the pool and wait for its result"""
+    if not _pending.acquire(timeout=QUEUE_TIMEOUT):
+        raise HashingBusy()
+    try:
+        return _executor.submit(function, *args).result()
+    finally:
+        _pending.release()
+
+
+def method_of(password_hash):
+    """The method part of a stored hash, e.g. 'scrypt:32768:8:1'"""
+    return password_hash.split('$', 1)[0]
+
+
+@lru_cache(maxsize=1)
+def _stored_method():
+    """The configured method spelled the way Werkzeug stores it
+
+    'pbkdf2' becomes 'pbkdf2:sha256:<default iterations>', so stored hashes
+    compare equal. Found by hashing once, on first use rather than at import.
+    """
+    return method_of(generate_password_hash('', HASH_METHOD))
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, HASH_METHOD)
+
+
+def verify_password(password_hash, password):
+    # Accounts carried over without a password never match
+    if not password_hash:
+        return False
+    return _run(check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """True when a hash was made with other parameters than the configured ones"""
+    return method_of(password_hash) != _stored_method()
+
+
+def _time_method(method, rounds=3):
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        generate_password_hash('calibration password', method)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def calibrate(target_ms, algorithm='scrypt'):
+    """Cheapest method string for algorithm whose hash takes at least target_ms here
+
+    Doubles the cost factor (scrypt N, or PBKDF2 iterations) until one hash
+    reaches the target. Returns (method, measured milliseconds).
+    """
+    target = target_ms / 1000
+    if algorithm == 'scrypt':
+        cost, method_for = 2 ** 12, lambda n: f'scrypt:{n}:8:1'
+        limit = 2 ** 20
+    else:
+        cost, method_for = 50_000, lambda n: f'pbkdf2:sha256:{n}'
+        limit = 50_000 * 2 ** 10
+
+    elapsed = _time_method(method_for(cost))
+    while elapsed < target and cost < limit:
+        cost *= 2
+        elapsed = _time_method(method_for(cost))
+    return method_for(cost), elapsed * 1000
@@ -0,0 +1,78 @@
+import threading
+
+# Client totals within this much of the server's are accepted
+TOTAL_TOLERANCE = 0.01
+# Most units of one product a cart line or order line may hold
+MAX_QUANTITY = 99
+
+
+class PricingError(Exception):
+    """A cart line cannot be priced"""
+
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+class PriceBook:
+    """Flat (kind, id) -> (name, price, in_stock) snapshot of every catalog
+
+    Subscribed to the catalog stores, it is updated per product change
+    rather than rebuilt, so a cart is priced with one dict lookup per line.
+    """
+
+    def __init__(self):
+        self._prices = {}
+        self._lock = threading.Lock()
+
+    def listener(self, kind):
+        """CatalogStore listener that keeps products of one kind priced"""
+        def on_change(old, new):
+            with self._lock:
+                if new is None:
+                    self._prices.pop((kind, old['id']), None)
+                else:
+                    self._prices[(kind, new['id'])] = (new['name'], new['price'], new.get('in_stock', True))
+        return on_change
+
+    def price_line(self, kind, product_id, quantity):
+        """Catalog line for one cart item: {'type','id','name','price','quantity'}"""
+        try:
+            product_id = int(product_id)
+            quantity = int(quantity)
+        except (TypeError, ValueError):
+            raise PricingError('بيانات المنتج غير صحيحة')
+        if quantity <= 0:
+            raise PricingError('الكمية يجب أن تكون أكبر من صفر')
+        if quantity > MAX_QUANTITY:
+            raise PricingError(f'الكمية يجب ألا تزيد عن {MAX_QUANTITY}')
+
+        entry = self._prices.get((kind, product_id))
+        if entry is None:
+            raise PricingError('المنتج غير موجود')
+        name, price, in_stock = entry
+        if not in_stock:
+            raise PricingError(f'المنتج {name} غير متوفر حالياً')
+        return {'type': kind, 'id': product_id, 'name': name, 'price': price, 'quantity': quantity}
+
+    def price_cart(self, items):
+        """Price cart items sent by the storefront from the catalog
+
+        Client-supplied names and prices are ignored. Returns (lines, total);
+        raises PricingError for unknown, unavailable or malformed items.
+        """
+        if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+            raise PricingError('بيانات المنتج غير صحيحة')
+        lines = [
+            self.price_line(item.get('type'), item.get('id'), item.get('quantity', 1))
+            for item in items
+        ]
+        total = round(sum(line['price'] * line['quantity'] for line in lines), 2)
+        return lines, total
+
+
+def totals_match(client_total, server_total):
+    try:
+        return abs(float(client_total) - server_total) <= TOTAL_TOLERANCE
+    except (TypeError, ValueError):
+        return False
@@ -0,0 +1,93 @@
+import os
+import re
+import time
+from collections import Counter
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Statements slower than this are logged with the route that ran them
+SLOW_QUERY_MS = float(os.environ.get('SQL_SLOW_MS', '100'))
+# A statement shape run this many times in one request is reported as a likely N+1
+REPEAT_THRESHOLD = int(os.environ.get('SQL_REPEAT_THRESHOLD', '5'))
+# Longest statement text put in a log line
+MAX_STATEMENT_LENGTH = 300
+
+# Bound parameters as SQLite (?) and psycopg2 (%(name)s) write them
+_PARAMETER = re.compile(r'%\(\w+\)s')
+# IN lists expanded to one parameter per value
+_PARAMETER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+_installed = False
+
+
+def statement_shape(statement):
+    """A statement with its parameters and IN lists collapsed
+
+    Two queries with the same shape differ only in the values bound to
+    them, such as one query per order to load its items.
+    """
+    shape = _PARAMETER.sub('?', statement)
+    shape = _WHITESPACE.sub(' ', shape).strip()
+    return _PARAMETER_LIST.sub('(?)', shape)
+
+
+def _shorten(statement):
+    statement = _WHITESPACE.sub(' ', statement).strip()
+    if len(statement) > MAX_STATEMENT_LENGTH:
+        return statement[:MAX_STATEMENT_LENGTH] + '...'
+    return statement
+
+
+def _route():
+    if not has_request_context():
+        return 'outside a request'
+    return f'{request.method} {request.path} ({request.endpoint or "unmatched"})'
+
+
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('profile_started', []).append(time.perf_counter())
+
+
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    elapsed_ms = (time.perf_counter() - conn.info['profile_started'].pop()) * 1000
+    if elapsed_ms >= SLOW_QUERY_MS:
+        current_app.logger.warning(
+            'Slow query (%.1f ms) in %s: %s', elapsed_ms, _route(), _shorten(statement)
+        )
+    if has_request_context():
+        profile = g.setdefault('sql_profile', {'count': 0, 'ms': 0.0, 'shapes': Counter()})
+        profile['count'] += 1
+        profile['ms'] += elapsed_ms
+        profile['shapes'][statement_shape(statement)] += 1
+
+
+def _report(response):
+    """Log repeated statement shapes and, in debug mode, add a Server-Timing header"""
+    profile = g.pop('sql_profile', None) or {'count': 0, 'ms': 0.0, 'shapes': Counter()}
+    repeated = [(shape, count) for shape, count in profile['shapes'].items() if count >= REPEAT_THRESHOLD]
+    for shape, count in repeated:
+        current_app.logger.warning(
+            'Possible N+1: %d queries of the same shape in %s: %s', count, _route(), _shorten(shape)
+        )
+
+    if current_app.debug:
+        # Shown under "Timing" in the browser's developer tools
+        description = f"{profile['count']} queries, {len(repeated)} repeated"
+        response.headers.add('Server-Timing', f'db;dur={profile["ms"]:.1f};desc="{description}"')
+    return response
+
+
+def enable(app):
+    """Profile the SQL run by app's requests
+
+    Opt-in (SQL_PROFILE=1), as it normalizes every statement and so costs
+    a little on each query.
+    """
+    global _installed
+    if not _installed:
+        event.listen(Engine, 'before_cursor_execute', _query_started)
+        event.listen(Engine, 'after_cursor_execute', _query_finished)
+        _installed = True
+    app.after_request(_report)
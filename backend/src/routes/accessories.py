@@ -1,9 +1,13 @@
 from flask import Blueprint, jsonify, request
 from src.models.user import db
+from src.models.product import Accessory
+from src.facets import faceted_listing
+from src.cache import cached
+from src.storefront import MAX_FEATURED, ProductCatalog, storefront
 
 accessories_bp = Blueprint('accessories', __name__)
 
-# Sample accessories data
+# Sample accessories seeded into an empty database
 ACCESSORIES_DATA = [
     {
         'id': 1,
@@ -103,30 +107,34 @@ ACCESSORIES_DATA = [
     }
 ]
 
+def accessories_catalog():
+    """A new in-memory catalog of the accessory table, one per app"""
+    return ProductCatalog(
+        Accessory, ACCESSORIES_DATA, 'accessory', ('category', 'brand'),
+        search_fields={'name': 3, 'brand': 2, 'description': 1}
+    )
+
+def accessories():
+    """The current app's accessories catalog"""
+    return storefront().accessories
+
 @accessories_bp.route('/accessories', methods=['GET'])
+@cached(lambda: accessories().store.version)
 def get_accessories():
-    """Get all accessories or filter by category/brand"""
-    category = request.args.get('category')
-    brand = request.args.get('brand')
-    
-    accessories = ACCESSORIES_DATA.copy()
-    
-    if category:
-        accessories = [acc for acc in accessories if acc['category'].lower() == category.lower()]
-    
-    if brand:
-        accessories = [acc for acc in accessories if acc['brand'].lower() == brand.lower()]
-    
-    return jsonify({
-        'success': True,
-        'accessories': accessories,
-        'total': len(accessories)
-    })
+    """Get accessories filtered by facets, optionally paginated and with facet counts
+
+    Repeat category/brand/in_stock to accept several values; min_price,
+    max_price and min_rating bound ranges. match=any ORs the filters
+    instead of ANDing them and facets=1 adds per-value counts.
+    """
+    catalog = accessories()
+    return faceted_listing(catalog.store, catalog.facets, 'accessories')
 
 @accessories_bp.route('/accessories/<int:accessory_id>', methods=['GET'])
+@cached(lambda: accessories().store.version)
 def get_accessory(accessory_id):
     """Get specific accessory by ID"""
-    accessory = next((acc for acc in ACCESSORIES_DATA if acc['id'] == accessory_id), None)
+    accessory = accessories().store.get(accessory_id)
     
     if not accessory:
         return jsonify({
@@ -140,9 +148,10 @@ def get_accessory(accessory_id):
     })
 
 @accessories_bp.route('/accessories/categories', methods=['GET'])
+@cached(lambda: accessories().store.version)
 def get_accessory_categories():
     """Get all accessory categories"""
-    categories = list(set(acc['category'] for acc in ACCESSORIES_DATA))
+    categories = accessories().facets.values('category')
     
     return jsonify({
         'success': True,
@@ -150,9 +159,10 @@ def get_accessory_categories():
     })
 
 @accessories_bp.route('/accessories/brands', methods=['GET'])
+@cached(lambda: accessories().store.version)
 def get_brands():
     """Get all available brands"""
-    brands = list(set(acc['brand'] for acc in ACCESSORIES_DATA))
+    brands = accessories().facets.values('brand')
     
     return jsonify({
         'success': True,
@@ -160,19 +170,28 @@ def get_brands():
     })
 
 @accessories_bp.route('/accessories/featured', methods=['GET'])
+@cached(lambda: accessories().store.version)
 def get_featured_accessories():
-    """Get featured accessories (highest rated)"""
-    featured = sorted(ACCESSORIES_DATA, key=lambda x: x['rating'], reverse=True)[:3]
+    """Get featured accessories (highest rated in stock), optionally per category"""
+    catalog = accessories()
+    category = request.args.get('category')
+    k = request.args.get('k', type=int, default=3)
+    k = max(1, min(k, MAX_FEATURED))
+    
+    featured = [catalog.store.get(product_id) for product_id in catalog.top_rated.top(k, category)]
     
     return jsonify({
         'success': True,
         'featured_accessories': featured
     })
 
+# Not response-cached: the index lookup is cheap, and every distinct query
+# would push catalog pages out of the shared cache
 @accessories_bp.route('/accessories/search', methods=['GET'])
 def search_accessories():
-    """Search accessories by name"""
-    query = request.args.get('q', '').lower()
+    """Search accessories by name, brand or description"""
+    catalog = accessories()
+    query = request.args.get('q', '').strip()
     
     if not query:
         return jsonify({
@@ -180,10 +199,7 @@ def search_accessories():
             'message': 'Search query is required'
         }), 400
     
-    results = [
-        acc for acc in ACCESSORIES_DATA 
-        if query in acc['name'].lower() or query in acc['description'].lower()
-    ]
+    results = [catalog.store.get(acc_id) for acc_id in catalog.search.search(query)]
     
     return jsonify({
         'success': True,
@@ -192,15 +208,13 @@ def search_accessories():
     })
 
 @accessories_bp.route('/accessories/by-price', methods=['GET'])
+@cached(lambda: accessories().store.version)
 def get_accessories_by_price():
     """Get accessories filtered by price range"""
-    min_price = request.args.get('min_price', type=int, default=0)
-    max_price = request.args.get('max_price', type=int, default=float('inf'))
+    min_price = request.args.get('min_price', type=int)
+    max_price = request.args.get('max_price', type=int)
     
-    filtered = [
-        acc for acc in ACCESSORIES_DATA 
-        if min_price <= acc['price'] <= max_price
-    ]
+    filtered = accessories().store.by_price(min_price, max_price)
     
     return jsonify({
         'success': True,
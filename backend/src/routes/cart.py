@@ -0,0 +1,115 @@
+from flask import Blueprint, jsonify, request
+from src.models.user import db
+from src import carts
+from src.pricing import PricingError
+from src.storefront import storefront
+
+cart_bp = Blueprint('cart', __name__)
+
+def cart_not_found():
+    return jsonify({
+        'success': False,
+        'message': 'السلة غير موجودة أو انتهت صلاحيتها'
+    }), 404
+
+@cart_bp.route('/cart', methods=['POST'])
+def create_cart():
+    """Start an anonymous cart; keep the returned id to use it later"""
+    cart = carts.new_cart()
+    db.session.commit()
+    
+    return jsonify({
+        'success': True,
+        'cart': carts.priced(cart, storefront().price_book)
+    }), 201
+
+@cart_bp.route('/cart/<cart_id>', methods=['GET'])
+def get_cart(cart_id):
+    """Get a cart priced from the current catalog"""
+    cart = carts.get_cart(cart_id)
+    
+    if not cart:
+        return cart_not_found()
+    
+    return jsonify({
+        'success': True,
+        'cart': carts.priced(cart, storefront().price_book)
+    })
+
+def change_item(cart_id, add):
+    try:
+        cart = carts.get_cart(cart_id)
+        
+        if not cart:
+            return cart_not_found()
+        
+        data = request.get_json() or {}
+        default_quantity = 1 if add else None
+        carts.set_quantity(
+            cart, storefront().price_book, data.get('type'), data.get('id'),
+            data.get('quantity', default_quantity), add=add
+        )
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'cart': carts.priced(cart, storefront().price_book)
+        })
+        
+    except PricingError as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': e.message
+        }), 400
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'حدث خطأ في تحديث السلة: {str(e)}'
+        }), 500
+
+@cart_bp.route('/cart/<cart_id>/items', methods=['POST'])
+def add_item(cart_id):
+    """Add a product to the cart, or increase its quantity"""
+    return change_item(cart_id, add=True)
+
+@cart_bp.route('/cart/<cart_id>/items', methods=['PUT'])
+def update_item(cart_id):
+    """Set a product's quantity in the cart; 0 removes it"""
+    return change_item(cart_id, add=False)
+
+@cart_bp.route('/cart/<cart_id>/items/<kind>/<int:product_id>', methods=['DELETE'])
+def remove_item(cart_id, kind, product_id):
+    """Remove a product from the cart"""
+    cart = carts.get_cart(cart_id)
+    
+    if not cart:
+        return cart_not_found()
+    
+    items = carts.decode_items(cart.items)
+    items.pop((kind, product_id), None)
+    carts.save_items(cart, items)
+    db.session.commit()
+    
+    return jsonify({
+        'success': True,
+        'cart': carts.priced(cart, storefront().price_book)
+    })
+
+@cart_bp.route('/cart/<cart_id>', methods=['DELETE'])
+def clear_cart(cart_id):
+    """Empty the cart"""
+    cart = carts.get_cart(cart_id)
+    
+    if not cart:
+        return cart_not_found()
+    
+    carts.save_items(cart, {})
+    db.session.commit()
+    
+    return jsonify({
+        'success': True,
+        'cart': carts.priced(cart, storefront().price_book)
+    })
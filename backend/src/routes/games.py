@@ -1,9 +1,13 @@
 from flask import Blueprint, jsonify, request
 from src.models.user import db
+from src.models.product import Game
+from src.facets import faceted_listing
+from src.cache import cached
+from src.storefront import MAX_FEATURED, ProductCatalog, storefront
 
 games_bp = Blueprint('games', __name__)
 
-# Sample games data
+# Sample games seeded into an empty database
 GAMES_DATA = [
     {
         'id': 1,
@@ -73,30 +77,31 @@ GAMES_DATA = [
     }
 ]
 
+def games_catalog():
+    """A new in-memory catalog of the game table, one per app"""
+    return ProductCatalog(Game, GAMES_DATA, 'game', ('category', 'platform'))
+
+def games():
+    """The current app's games catalog"""
+    return storefront().games
+
 @games_bp.route('/games', methods=['GET'])
+@cached(lambda: games().store.version)
 def get_games():
-    """Get all games or filter by category/platform"""
-    category = request.args.get('category')
-    platform = request.args.get('platform')
-    
-    games = GAMES_DATA.copy()
-    
-    if category:
-        games = [game for game in games if game['category'].lower() == category.lower()]
-    
-    if platform:
-        games = [game for game in games if platform in game['platform']]
-    
-    return jsonify({
-        'success': True,
-        'games': games,
-        'total': len(games)
-    })
+    """Get games filtered by facets, optionally paginated and with facet counts
+
+    Repeat category/platform/in_stock to accept several values; min_price,
+    max_price and min_rating bound ranges. match=any ORs the filters
+    instead of ANDing them and facets=1 adds per-value counts.
+    """
+    catalog = games()
+    return faceted_listing(catalog.store, catalog.facets, 'games')
 
 @games_bp.route('/games/<int:game_id>', methods=['GET'])
+@cached(lambda: games().store.version)
 def get_game(game_id):
     """Get specific game by ID"""
-    game = next((game for game in GAMES_DATA if game['id'] == game_id), None)
+    game = games().store.get(game_id)
     
     if not game:
         return jsonify({
@@ -110,9 +115,10 @@ def get_game(game_id):
     })
 
 @games_bp.route('/games/categories', methods=['GET'])
+@cached(lambda: games().store.version)
 def get_categories():
     """Get all game categories"""
-    categories = list(set(game['category'] for game in GAMES_DATA))
+    categories = games().facets.values('category')
     
     return jsonify({
         'success': True,
@@ -120,31 +126,37 @@ def get_categories():
     })
 
 @games_bp.route('/games/platforms', methods=['GET'])
+@cached(lambda: games().store.version)
 def get_platforms():
     """Get all available platforms"""
-    platforms = set()
-    for game in GAMES_DATA:
-        platforms.update(game['platform'])
-    
     return jsonify({
         'success': True,
-        'platforms': list(platforms)
+        'platforms': games().facets.values('platform')
     })
 
 @games_bp.route('/games/featured', methods=['GET'])
+@cached(lambda: games().store.version)
 def get_featured_games():
-    """Get featured games (highest rated)"""
-    featured = sorted(GAMES_DATA, key=lambda x: x['rating'], reverse=True)[:4]
+    """Get featured games (highest rated in stock), optionally per category"""
+    catalog = games()
+    category = request.args.get('category')
+    k = request.args.get('k', type=int, default=4)
+    k = max(1, min(k, MAX_FEATURED))
+    
+    featured = [catalog.store.get(product_id) for product_id in catalog.top_rated.top(k, category)]
     
     return jsonify({
         'success': True,
         'featured_games': featured
     })
 
+# Not response-cached: the index lookup is cheap, and every distinct query
+# would push catalog pages out of the shared cache
 @games_bp.route('/games/search', methods=['GET'])
 def search_games():
-    """Search games by name"""
-    query = request.args.get('q', '').lower()
+    """Search games by name or description"""
+    catalog = games()
+    query = request.args.get('q', '').strip()
     
     if not query:
         return jsonify({
@@ -152,10 +164,7 @@ def search_games():
             'message': 'Search query is required'
         }), 400
     
-    results = [
-        game for game in GAMES_DATA 
-        if query in game['name'].lower() or query in game['description'].lower()
-    ]
+    results = [catalog.store.get(game_id) for game_id in catalog.search.search(query)]
     
     return jsonify({
         'success': True,
@@ -0,0 +1,54 @@
+from flask import Blueprint, current_app, jsonify, request, send_file
+from src.assets import IMMUTABLE_MAX_AGE
+from src.storefront import storefront
+
+images_bp = Blueprint('images', __name__)
+
+def image_pipeline():
+    """The current app's ImagePipeline over its static folder"""
+    return current_app.extensions['image_pipeline']
+
+@images_bp.route('/images/manifest', methods=['GET'])
+def image_manifest():
+    """Responsive variants for every catalog image, or the ones named by ?image=
+
+    Only catalog images are looked up, so the endpoint cannot be used to
+    probe for other files on the server.
+    """
+    catalog_images = {product.get('image') for catalog in storefront().catalogs for product in catalog.store.all()}
+    requested = request.args.getlist('image')
+    requested = catalog_images.intersection(requested) if requested else catalog_images
+    
+    url_prefix = request.script_root + '/api/images'
+    pipeline = image_pipeline()
+    images = {}
+    for image in sorted(filter(None, requested)):
+        entry = pipeline.variants(image, url_prefix)
+        if entry:
+            images[image] = entry
+    
+    response = jsonify({
+        'success': True,
+        'images': images
+    })
+    # Cheap to recompute, but changes when images do; keep it briefly
+    response.cache_control.public = True
+    response.cache_control.max_age = 300
+    return response
+
+@images_bp.route('/images/<name>', methods=['GET'])
+def get_derivative(name):
+    """A resized or WebP copy of a product image"""
+    path = image_pipeline().derivative(name)
+    
+    if not path:
+        return jsonify({
+            'success': False,
+            'message': 'Image not found'
+        }), 404
+    
+    # Derivative URLs change whenever their source does
+    response = send_file(path, conditional=True, max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
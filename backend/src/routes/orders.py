@@ -1,27 +1,67 @@
 from flask import Blueprint, jsonify, request
-from datetime import datetime
+import click
+from datetime import date, datetime
+from sqlalchemy import and_, or_
 from src.models.user import db
-from src.telegram_bot import telegram_bot, TELEGRAM_CHAT_ID
+from src.models.order import Order, OrderItem
+from src import order_stats
+from src import inventory
+from src import carts
+from src.pricing import PricingError, totals_match
+from src.storefront import storefront
+from src.auth import current_user, user_cache
+from src.pagination import encode_cursor, fetch_page, page_args
+from src import notifications
 
 orders_bp = Blueprint('orders', __name__)
 
-# In-memory storage for orders (in production, use database)
-ORDERS_DATA = []
-ORDER_COUNTER = 1
+def build_order_item(line):
+    """Convert a priced cart line into an OrderItem"""
+    return OrderItem(
+        product_type=line['type'],
+        product_id=line['id'],
+        name=line['name'],
+        price=line['price'],
+        quantity=line['quantity']
+    )
 
 @orders_bp.route('/orders', methods=['POST'])
 def create_order():
     """Create a new order"""
-    global ORDER_COUNTER
-    
     try:
         data = request.get_json()
         
         # Extract customer info and items
         customer_info = data.get('customer_info', {})
         items = data.get('items', [])
-        total = data.get('total', 0)
-        user_id = data.get('user_id')
+        
+        # The account comes from the access token. Clients without one may
+        # still name it, but only an existing user: PostgreSQL enforces the
+        # foreign key, so an unknown id would otherwise fail on commit
+        user = current_user()
+        user_id = user['id'] if user else data.get('user_id')
+        if user is None and user_id is not None:
+            try:
+                user = user_cache().get(int(user_id))
+            except (TypeError, ValueError):
+                user = None
+            if user is None:
+                return jsonify({
+                    'success': False,
+                    'message': 'المستخدم غير موجود'
+                }), 400
+            user_id = user['id']
+        
+        # A server-side cart can be checked out instead of sending the items
+        cart = None
+        if data.get('cart_id') and not items:
+            cart = carts.get_cart(data['cart_id'])
+            if not cart:
+                return jsonify({
+                    'success': False,
+                    'message': 'السلة غير موجودة أو انتهت صلاحيتها'
+                }), 404
+            items = carts.order_items(cart)
         
         # Validate required fields
         if not customer_info.get('name'):
@@ -48,52 +88,77 @@ def create_order():
                 'message': 'يجب أن يحتوي الطلب على منتج واحد على الأقل'
             }), 400
         
+        # Price the cart from the catalog and hold the client to it
+        try:
+            lines, total = storefront().price_book.price_cart(items)
+        except PricingError as e:
+            return jsonify({
+                'success': False,
+                'message': e.message
+            }), 400
+        
         if total <= 0:
             return jsonify({
                 'success': False,
                 'message': 'المبلغ الإجمالي يجب أن يكون أكبر من صفر'
             }), 400
         
+        if 'total' in data and not totals_match(data['total'], total):
+            return jsonify({
+                'success': False,
+                'message': 'تغيرت أسعار بعض المنتجات، يرجى مراجعة السلة',
+                'items': lines,
+                'total': total
+            }), 409
+        
         # Create order
-        order = {
-            'id': ORDER_COUNTER,
-            'order_number': f'GO-{ORDER_COUNTER:06d}',
-            'user_id': user_id,
-            'customer_name': customer_info['name'],
-            'customer_email': customer_info['email'],
-            'customer_phone': customer_info['phone'],
-            'customer_address': customer_info.get('address', ''),
-            'items': items,
-            'total_amount': total,
-            'status': 'pending',
-            'payment_method': data.get('payment_method', 'cash_on_delivery'),
-            'notes': data.get('notes', ''),
-            'created_at': datetime.now().isoformat(),
-            'updated_at': datetime.now().isoformat()
-        }
+        order = Order(
+            user_id=user_id,
+            customer_name=customer_info['name'],
+            customer_email=customer_info['email'],
+            customer_phone=customer_info['phone'],
+            customer_address=customer_info.get('address', ''),
+            total_amount=total,
+            status='pending',
+            payment_method=data.get('payment_method', 'cash_on_delivery'),
+            notes=data.get('notes', ''),
+            items=[build_order_item(line) for line in lines]
+        )
         
-        ORDERS_DATA.append(order)
-        ORDER_COUNTER += 1
+        db.session.add(order)
+        # The order number is derived from the id, which is assigned on flush
+        db.session.flush()
+        order.order_number = f'GO-{order.id:06d}'
+        # Take the stock in the same transaction; a short line undoes the order
+        inventory.reserve(order)
+        order_stats.record_order_created(order)
+        if cart is not None:
+            carts.save_items(cart, {})
         
-        # Send Telegram notification
-        if telegram_bot and TELEGRAM_CHAT_ID != "YOUR_CHAT_ID_HERE":
-            try:
-                telegram_bot.send_order_notification(TELEGRAM_CHAT_ID, {
-                    'customer_info': customer_info,
-                    'items': items,
-                    'total': total,
-                    'order_number': order['order_number']
-                })
-            except Exception as e:
-                print(f"Failed to send Telegram notification: {e}")
+        # Queue the Telegram notification; it is sent in the background
+        notifications.enqueue('order', {
+            'customer_info': customer_info,
+            'items': lines,
+            'total': total,
+            'order_number': order.order_number
+        })
+        db.session.commit()
         
         return jsonify({
             'success': True,
             'message': 'تم إنشاء الطلب بنجاح',
-            'order': order
+            'order': order.to_dict()
         }), 201
         
+    except inventory.InventoryError as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': e.message
+        }), 409
+        
     except Exception as e:
+        db.session.rollback()
         return jsonify({
             'success': False,
             'message': f'حدث خطأ في إنشاء الطلب: {str(e)}'
@@ -101,31 +166,63 @@ def create_order():
 
 @orders_bp.route('/orders', methods=['GET'])
 def get_orders():
-    """Get all orders (admin endpoint)"""
+    """Get orders page by page, newest first (admin endpoint)"""
     status_filter = request.args.get('status')
-    user_id = request.args.get('user_id')
     
-    orders = ORDERS_DATA.copy()
+    try:
+        user_id = int(request.args['user_id']) if request.args.get('user_id') else None
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'رقم المستخدم غير صحيح'
+        }), 400
+    
+    try:
+        limit, after = page_args(default_limit=50)
+        if after:
+            after_created_at, after_id = datetime.fromisoformat(after[0]), int(after[1])
+    except (ValueError, TypeError, IndexError):
+        return jsonify({
+            'success': False,
+            'message': 'معايير الصفحات غير صحيحة'
+        }), 400
+    
+    query = Order.query
     
     if status_filter:
-        orders = [order for order in orders if order['status'] == status_filter]
+        query = query.filter_by(status=status_filter)
+    
+    if user_id is not None:
+        query = query.filter_by(user_id=user_id)
     
-    if user_id:
-        orders = [order for order in orders if order.get('user_id') == int(user_id)]
+    # Keyset pagination: continue strictly after the last (created_at, id) seen
+    if after:
+        query = query.filter(or_(
+            Order.created_at < after_created_at,
+            and_(Order.created_at == after_created_at, Order.id < after_id)
+        ))
     
     # Sort by creation date (newest first)
-    orders.sort(key=lambda x: x['created_at'], reverse=True)
+    query = query.order_by(Order.created_at.desc(), Order.id.desc())
+    orders, has_more = fetch_page(query, limit)
+    
+    next_cursor = None
+    if has_more:
+        last = orders[-1]
+        next_cursor = encode_cursor(last.created_at.isoformat(), last.id)
     
     return jsonify({
         'success': True,
-        'orders': orders,
-        'total': len(orders)
+        'orders': [order.to_dict() for order in orders],
+        # Orders on this page; keyset pages carry no overall total
+        'count': len(orders),
+        'next_cursor': next_cursor
     })
 
 @orders_bp.route('/orders/<int:order_id>', methods=['GET'])
 def get_order(order_id):
     """Get specific order by ID"""
-    order = next((order for order in ORDERS_DATA if order['id'] == order_id), None)
+    order = db.session.get(Order, order_id)
     
     if not order:
         return jsonify({
@@ -135,7 +232,7 @@ def get_order(order_id):
     
     return jsonify({
         'success': True,
-        'order': order
+        'order': order.to_dict()
     })
 
 @orders_bp.route('/orders/<int:order_id>/status', methods=['PUT'])
@@ -158,7 +255,7 @@ def update_order_status(order_id):
                 'message': f'حالة غير صحيحة. الحالات المتاحة: {", ".join(valid_statuses)}'
             }), 400
         
-        order = next((order for order in ORDERS_DATA if order['id'] == order_id), None)
+        order = db.session.get(Order, order_id)
         
         if not order:
             return jsonify({
@@ -166,16 +263,31 @@ def update_order_status(order_id):
                 'message': 'الطلب غير موجود'
             }), 404
         
-        order['status'] = new_status
-        order['updated_at'] = datetime.now().isoformat()
+        old_status = order.status
+        order.status = new_status
+        # Cancelling puts the stock back; reopening a cancelled order takes it again
+        if new_status == 'cancelled' and old_status != 'cancelled':
+            inventory.release(order)
+        elif old_status == 'cancelled' and new_status != 'cancelled':
+            inventory.reserve(order)
+        order_stats.record_status_change(order, old_status)
+        db.session.commit()
         
         return jsonify({
             'success': True,
             'message': 'تم تحديث حالة الطلب بنجاح',
-            'order': order
+            'order': order.to_dict()
         })
         
+    except inventory.InventoryError as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': e.message
+        }), 409
+        
     except Exception as e:
+        db.session.rollback()
         return jsonify({
             'success': False,
             'message': f'حدث خطأ في تحديث حالة الطلب: {str(e)}'
@@ -184,7 +296,7 @@ def update_order_status(order_id):
 @orders_bp.route('/orders/search', methods=['GET'])
 def search_orders():
     """Search orders by order number or customer name"""
-    query = request.args.get('q', '').lower()
+    query = request.args.get('q', '').strip()
     
     if not query:
         return jsonify({
@@ -192,44 +304,56 @@ def search_orders():
             'message': 'استعلام البحث مطلوب'
         }), 400
     
-    results = [
-        order for order in ORDERS_DATA 
-        if (query in order['order_number'].lower() or 
-            query in order['customer_name'].lower() or
-            query in order['customer_email'].lower())
-    ]
+    # An exact order number is answered straight from its unique index
+    order = Order.query.filter_by(order_number=query.upper()).first()
+    if order:
+        results = [order]
+    else:
+        results = Order.query.filter(or_(
+            Order.order_number.icontains(query, autoescape=True),
+            Order.customer_name.icontains(query, autoescape=True),
+            Order.customer_email.icontains(query, autoescape=True)
+        )).order_by(Order.created_at.desc(), Order.id.desc()).all()
     
     return jsonify({
         'success': True,
-        'results': results,
+        'results': [order.to_dict() for order in results],
         'total': len(results)
     })
 
 @orders_bp.route('/orders/stats', methods=['GET'])
 def get_order_stats():
-    """Get order statistics"""
-    total_orders = len(ORDERS_DATA)
+    """Get order statistics, optionally for a date window (?from=&to=&granularity=day)"""
+    granularity = request.args.get('granularity')
     
-    status_counts = {}
-    total_revenue = 0
+    try:
+        start = request.args.get('from')
+        end = request.args.get('to')
+        start = date.fromisoformat(start) if start else None
+        end = date.fromisoformat(end) if end else None
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'message': 'صيغة التاريخ غير صحيحة، استخدم YYYY-MM-DD'
+        }), 400
     
-    for order in ORDERS_DATA:
-        status = order['status']
-        status_counts[status] = status_counts.get(status, 0) + 1
-        
-        if order['status'] in ['confirmed', 'processing', 'shipped', 'delivered']:
-            total_revenue += order['total_amount']
+    if granularity and granularity not in order_stats.GRANULARITIES:
+        return jsonify({
+            'success': False,
+            'message': f'دقة غير صحيحة. القيم المتاحة: {", ".join(order_stats.GRANULARITIES)}'
+        }), 400
     
     return jsonify({
         'success': True,
-        'stats': {
-            'total_orders': total_orders,
-            'total_revenue': total_revenue,
-            'status_breakdown': status_counts,
-            'average_order_value': total_revenue / max(total_orders, 1)
-        }
+        'stats': order_stats.get_stats(start, end, granularity)
     })
 
+@orders_bp.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Recompute the order statistics rollups from the orders table"""
+    buckets = order_stats.rebuild()
+    click.echo(f'Rebuilt {buckets} order statistics buckets')
+
 @orders_bp.route('/contact', methods=['POST'])
 def contact_form():
     """Handle contact form submissions"""
@@ -253,12 +377,9 @@ def contact_form():
             'created_at': datetime.now().isoformat()
         }
         
-        # Send Telegram notification
-        if telegram_bot and TELEGRAM_CHAT_ID != "YOUR_CHAT_ID_HERE":
-            try:
-                telegram_bot.send_contact_message(TELEGRAM_CHAT_ID, contact_data)
-            except Exception as e:
-                print(f"Failed to send Telegram notification: {e}")
+        # Queue the Telegram notification; it is sent in the background
+        notifications.enqueue('contact', contact_data)
+        db.session.commit()
         
         return jsonify({
             'success': True,
@@ -266,6 +387,7 @@ def contact_form():
         }), 200
         
     except Exception as e:
+        db.session.rollback()
         return jsonify({
             'success': False,
             'message': f'حدث خطأ في إرسال الرسالة: {str(e)}'
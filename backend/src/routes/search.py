@@ -0,0 +1,18 @@
+from flask import Blueprint, jsonify, request
+from src.storefront import MAX_SUGGESTIONS, storefront
+
+search_bp = Blueprint('search', __name__)
+
+# Not response-cached: a trie lookup is cheap, and every keystroke's prefix
+# would push catalog pages out of the shared cache
+@search_bp.route('/search/suggest', methods=['GET'])
+def suggest():
+    """Autocomplete product names and brands by prefix, best rated first"""
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', type=int, default=8)
+    limit = max(1, min(limit, MAX_SUGGESTIONS))
+    
+    return jsonify({
+        'success': True,
+        'suggestions': storefront().suggestions.suggest(query, limit)
+    })
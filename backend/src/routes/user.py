@@ -1,11 +1,26 @@
 from flask import Blueprint, jsonify, request
+from sqlalchemy import delete, update
 from src.models.user import User, db
-from src.telegram_bot import telegram_bot, TELEGRAM_CHAT_ID
-from werkzeug.security import generate_password_hash, check_password_hash
+from src.models.cart import Cart
+from src.models.order import Order
+from src.pagination import encode_cursor, fetch_page, page_args
+from src import notifications
+from src import carts
+from src import passwords
+from src.auth import current_user, issue_token, login_required, public, user_cache
+from src.passwords import HashingBusy
+from src.throttle import client_ip, login_throttle
+import click
 import re
 
 user_bp = Blueprint('user', __name__)
 
+def hashing_busy():
+    return jsonify({
+        'success': False,
+        'message': 'الخادم مشغول حالياً، يرجى المحاولة بعد قليل'
+    }), 503
+
 def validate_email(email):
     pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
     return re.match(pattern, email) is not None
@@ -47,7 +62,7 @@ def register():
             }), 400
         
         # Check if user already exists
-        existing_user = User.query.filter_by(email=email).first()
+        existing_user = User.query.filter(db.func.lower(User.email) == email).first()
         if existing_user:
             return jsonify({
                 'success': False,
@@ -55,7 +70,7 @@ def register():
             }), 400
         
         # Create new user
-        hashed_password = generate_password_hash(password)
+        hashed_password = passwords.hash_password(password)
         user = User(
             username=name,
             email=email,
@@ -64,18 +79,14 @@ def register():
         )
         
         db.session.add(user)
-        db.session.commit()
         
-        # Send Telegram notification for new user registration
-        if telegram_bot and TELEGRAM_CHAT_ID != "YOUR_CHAT_ID_HERE":
-            try:
-                telegram_bot.send_user_registration_notification(TELEGRAM_CHAT_ID, {
-                    'name': name,
-                    'email': email,
-                    'phone': phone
-                })
-            except Exception as e:
-                print(f"Failed to send Telegram notification: {e}")
+        # Queue the Telegram notification for new user registration
+        notifications.enqueue('registration', {
+            'name': name,
+            'email': email,
+            'phone': phone
+        })
+        db.session.commit()
         
         return jsonify({
             'success': True,
@@ -85,9 +96,14 @@ def register():
                 'name': user.username,
                 'email': user.email,
                 'phone': user.phone
-            }
+            },
+            'token': issue_token(user)
         }), 201
         
+    except HashingBusy:
+        db.session.rollback()
+        return hashing_busy()
+        
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -110,15 +126,36 @@ def login():
         email = data['email'].strip().lower()
         password = data['password']
         
+        # Throttle before hashing so a login flood costs no CPU
+        retry_after = login_throttle().hit(client_ip(), email)
+        if retry_after:
+            response = jsonify({
+                'success': False,
+                'message': 'محاولات تسجيل دخول كثيرة، يرجى المحاولة لاحقاً'
+            })
+            response.headers['Retry-After'] = str(int(retry_after) + 1)
+            return response, 429
+        
         # Find user by email
-        user = User.query.filter_by(email=email).first()
+        user = User.query.filter(db.func.lower(User.email) == email).first()
         
-        if not user or not check_password_hash(user.password_hash, password):
+        if not user or not passwords.verify_password(user.password_hash, password):
             return jsonify({
                 'success': False,
                 'message': 'البريد الإلكتروني أو كلمة المرور غير صحيحة'
             }), 401
         
+        login_throttle().succeeded(email)
+        # Move the stored hash to the configured parameters while the password is at hand
+        if passwords.needs_rehash(user.password_hash):
+            user.password_hash = passwords.hash_password(password)
+        
+        # Fold the cart filled in before logging in into the user's own cart
+        cart = carts.merge_into_user_cart(user.id, data.get('cart_id'))
+        db.session.commit()
+        # Requests made with the new token find the user already cached
+        user_cache().put(user)
+        
         return jsonify({
             'success': True,
             'message': 'تم تسجيل الدخول بنجاح',
@@ -127,19 +164,35 @@ def login():
                 'name': user.username,
                 'email': user.email,
                 'phone': user.phone
-            }
+            },
+            'token': issue_token(user),
+            'cart_id': cart.id
         }), 200
         
+    except HashingBusy:
+        db.session.rollback()
+        return hashing_busy()
+        
     except Exception as e:
+        db.session.rollback()
         return jsonify({
             'success': False,
             'message': 'حدث خطأ في تسجيل الدخول'
         }), 500
 
+@user_bp.route('/users/me', methods=['GET'])
+@login_required
+def get_current_user():
+    """The user the access token belongs to"""
+    return jsonify({
+        'success': True,
+        'user': public(current_user())
+    }), 200
+
 @user_bp.route('/users/profile/<int:user_id>', methods=['GET'])
 def get_profile(user_id):
     try:
-        user = User.query.get(user_id)
+        user = user_cache().get(user_id)
         
         if not user:
             return jsonify({
@@ -149,13 +202,7 @@ def get_profile(user_id):
         
         return jsonify({
             'success': True,
-            'user': {
-                'id': user.id,
-                'name': user.username,
-                'email': user.email,
-                'phone': user.phone,
-                'created_at': user.created_at.isoformat() if hasattr(user, 'created_at') else None
-            }
+            'user': public(user)
         }), 200
         
     except Exception as e:
@@ -165,9 +212,16 @@ def get_profile(user_id):
         }), 500
 
 @user_bp.route('/users/profile/<int:user_id>', methods=['PUT'])
+@login_required
 def update_profile(user_id):
     try:
-        user = User.query.get(user_id)
+        if current_user()['id'] != user_id:
+            return jsonify({
+                'success': False,
+                'message': 'غير مصرح لك بتعديل هذا الحساب'
+            }), 403
+        
+        user = db.session.get(User, user_id)
         
         if not user:
             return jsonify({
@@ -195,7 +249,7 @@ def update_profile(user_id):
                     }), 400
                 
                 # Check if email is already taken
-                existing_user = User.query.filter_by(email=new_email).first()
+                existing_user = User.query.filter(db.func.lower(User.email) == new_email).first()
                 if existing_user and existing_user.id != user_id:
                     return jsonify({
                         'success': False,
@@ -213,9 +267,10 @@ def update_profile(user_id):
                     'message': 'كلمة المرور يجب أن تكون 6 أحرف على الأقل'
                 }), 400
             
-            user.password_hash = generate_password_hash(new_password)
+            user.password_hash = passwords.hash_password(new_password)
         
         db.session.commit()
+        user_cache().invalidate(user_id)
         
         return jsonify({
             'success': True,
@@ -225,9 +280,15 @@ def update_profile(user_id):
                 'name': user.username,
                 'email': user.email,
                 'phone': user.phone
-            }
+            },
+            # A password change voids earlier tokens; this one replaces them
+            'token': issue_token(user)
         }), 200
         
+    except HashingBusy:
+        db.session.rollback()
+        return hashing_busy()
+        
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -238,7 +299,20 @@ def update_profile(user_id):
 @user_bp.route('/users', methods=['GET'])
 def get_users():
     try:
-        users = User.query.all()
+        try:
+            limit, after = page_args(default_limit=50)
+            after_id = int(after[0]) if after else None
+        except (ValueError, TypeError):
+            return jsonify({
+                'success': False,
+                'message': 'معايير الصفحات غير صحيحة'
+            }), 400
+        
+        query = User.query
+        if after_id is not None:
+            query = query.filter(User.id > after_id)
+        users, has_more = fetch_page(query.order_by(User.id), limit)
+        
         return jsonify({
             'success': True,
             'users': [{
@@ -246,7 +320,8 @@ def get_users():
                 'name': user.username,
                 'email': user.email,
                 'phone': user.phone
-            } for user in users]
+            } for user in users],
+            'next_cursor': encode_cursor(users[-1].id) if has_more else None
         }), 200
     except Exception as e:
         return jsonify({
@@ -265,8 +340,13 @@ def delete_user(user_id):
                 'message': 'المستخدم غير موجود'
             }), 404
         
+        # Done here as well as by the foreign keys' ON DELETE rules, which
+        # SQLite databases without foreign key enforcement would skip
+        db.session.execute(delete(Cart).where(Cart.user_id == user_id))
+        db.session.execute(update(Order).where(Order.user_id == user_id).values(user_id=None))
         db.session.delete(user)
         db.session.commit()
+        user_cache().invalidate(user_id)
         
         return jsonify({
             'success': True,
@@ -280,3 +360,10 @@ def delete_user(user_id):
             'message': 'حدث خطأ في حذف المستخدم'
         }), 500
 
+@user_bp.cli.command('calibrate-hash')
+@click.option('--target-ms', default=250, show_default=True, help='Time one password hash should take.')
+@click.option('--algorithm', type=click.Choice(['scrypt', 'pbkdf2']), default='scrypt', show_default=True)
+def calibrate_hash_command(target_ms, algorithm):
+    """Benchmark password hashing and suggest PASSWORD_HASH_METHOD"""
+    method, elapsed = passwords.calibrate(target_ms, algorithm)
+    click.echo(f'PASSWORD_HASH_METHOD={method}  ({elapsed:.0f} ms per hash on this machine)')
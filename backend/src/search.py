@@ -0,0 +1,283 @@
+import re
+from bisect import bisect_left, insort
+
+# Arabic diacritics (tashkeel), superscript alef and tatweel
+_ARABIC_MARKS = re.compile('[\u064B-\u065F\u0670\u0640]')
+_TOKEN = re.compile(r'\w+')
+
+# Letter variants folded to a single form so spelling differences still match:
+# hamza-carrying alefs to bare alef, alef maqsura and yeh-hamza to yeh,
+# waw-hamza to waw, teh marbuta to heh, and Arabic-Indic digits to ASCII
+_ARABIC_FOLDS = str.maketrans({
+    '\u0623': '\u0627', '\u0625': '\u0627', '\u0622': '\u0627', '\u0671': '\u0627',
+    '\u0649': '\u064A', '\u0626': '\u064A',
+    '\u0624': '\u0648',
+    '\u0629': '\u0647',
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+})
+
+
+def normalize_text(text):
+    """Lower-case text, strip Arabic diacritics and fold hamza/alef variants"""
+    text = _ARABIC_MARKS.sub('', text.lower())
+    return text.translate(_ARABIC_FOLDS)
+
+
+def _without_article(token):
+    """An Arabic word without its definite article, other tokens unchanged"""
+    if token.startswith('ال') and len(token) > 3:
+        return token[2:]
+    return token
+
+
+def tokenize(text):
+    """Split text into normalized search terms
+
+    Arabic words starting with the definite article are also indexed without
+    it, so 'السماعات' can be found by searching for 'سماعات'.
+    """
+    terms = []
+    for token in _TOKEN.findall(normalize_text(text)):
+        terms.append(token)
+        if _without_article(token) != token:
+            terms.append(_without_article(token))
+    return terms
+
+
+def query_terms(query):
+    """Normalized terms of a search query
+
+    The article is dropped from query words, so 'السماعات' also finds a
+    product named 'سماعات'; the bare form is indexed for both spellings.
+    """
+    return [_without_article(token) for token in _TOKEN.findall(normalize_text(query))]
+
+
+class SearchIndex:
+    """Inverted index over product text fields with prefix matching
+
+    Each term maps to a postings dict of product id -> weighted term count.
+    Terms are also kept in a sorted list so a query term can be expanded to
+    every indexed term it prefixes with bisect. Subscribe an instance to a
+    CatalogStore to keep it in sync with product changes.
+    """
+
+    def __init__(self, fields=None):
+        self.fields = fields or {'name': 3, 'description': 1}
+        self._postings = {}
+        self._terms = []
+        self._doc_terms = {}
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def _weighted_terms(self, product):
+        weights = {}
+        for field, weight in self.fields.items():
+            value = product.get(field)
+            if not value:
+                continue
+            if isinstance(value, (list, tuple)):
+                value = ' '.join(value)
+            for term in tokenize(value):
+                weights[term] = weights.get(term, 0) + weight
+        return weights
+
+    def add(self, product):
+        product_id = product['id']
+        if product_id in self._doc_terms:
+            self.remove(product)
+
+        weights = self._weighted_terms(product)
+        for term, weight in weights.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._terms.insert(bisect_left(self._terms, term), term)
+            postings[product_id] = weight
+        self._doc_terms[product_id] = tuple(weights)
+
+    def remove(self, product):
+        for term in self._doc_terms.pop(product['id'], ()):
+            postings = self._postings[term]
+            postings.pop(product['id'], None)
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect_left(self._terms, term)]
+
+    def on_change(self, old, new):
+        """CatalogStore listener: re-index the product that changed"""
+        if old is not None:
+            self.remove(old)
+        if new is not None:
+            self.add(new)
+
+    def _prefix_postings(self, prefix):
+        """Merged postings of every term starting with prefix
+
+        Exact term matches score double so 'cod' ranks a product named
+        'COD' above one that merely contains 'code'.
+        """
+        scores = {}
+        position = bisect_left(self._terms, prefix)
+        while position < len(self._terms) and self._terms[position].startswith(prefix):
+            term = self._terms[position]
+            boost = 2 if term == prefix else 1
+            for product_id, weight in self._postings[term].items():
+                score = weight * boost
+                if score > scores.get(product_id, 0):
+                    scores[product_id] = score
+            position += 1
+        return scores
+
+    def search(self, query):
+        """Ids of products matching every query term, best match first"""
+        terms = query_terms(query)
+        if not terms:
+            return []
+
+        scores = None
+        for term in dict.fromkeys(terms):
+            matches = self._prefix_postings(term)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {
+                    product_id: score + matches[product_id]
+                    for product_id, score in scores.items()
+                    if product_id in matches
+                }
+            if not scores:
+                return []
+
+        return sorted(scores, key=lambda product_id: -scores[product_id])
+
+
+MAX_TERM_LENGTH = 24
+
+
+class _TrieNode:
+    __slots__ = ('children', 'entries', 'top')
+
+    def __init__(self):
+        self.children = {}
+        # key -> rank for the terms that end at this node, created on demand
+        self.entries = None
+        # best (rank, key) pairs in this subtree, kept at most k long
+        self.top = []
+
+
+class SuggestionTrie:
+    """Prefix trie for typeahead that keeps the top-k entries at every node
+
+    Each node caches the best-ranked suggestions of its subtree, so answering
+    a prefix is a walk down the trie plus a slice, independent of how many
+    products share the prefix. Items are keyed by (kind, id) and ranked by
+    rating, highest first.
+    """
+
+    def __init__(self, k=10):
+        self.k = k
+        self._root = _TrieNode()
+        self._items = {}
+        self._terms = {}
+
+    @staticmethod
+    def _terms_for(product):
+        words = _TOKEN.findall(normalize_text(product['name']))
+        # Every word-start suffix so 'duty' also suggests 'Call of Duty'
+        terms = {' '.join(words[start:]) for start in range(len(words))}
+        if product.get('brand'):
+            terms.add(' '.join(_TOKEN.findall(normalize_text(product['brand']))))
+        terms.discard('')
+        # Nobody types past this many characters before picking a suggestion
+        return {term[:MAX_TERM_LENGTH] for term in terms}
+
+    def _refresh(self, path):
+        for node in reversed(path):
+            best = dict(node.entries or {})
+            for child in node.children.values():
+                for rank, key in child.top:
+                    if key not in best or rank < best[key]:
+                        best[key] = rank
+            node.top = sorted((rank, key) for key, rank in best.items())[:self.k]
+
+    def _path(self, term, create=False):
+        node = self._root
+        path = [node]
+        for char in term:
+            child = node.children.get(char)
+            if child is None:
+                if not create:
+                    return None
+                child = node.children[char] = _TrieNode()
+            node = child
+            path.append(node)
+        return path
+
+    def add(self, kind, product):
+        key = (kind, product['id'])
+        if key in self._items:
+            self.remove(kind, product)
+
+        self._items[key] = {
+            'type': kind,
+            'id': product['id'],
+            'name': product['name'],
+            'price': product['price'],
+            'rating': product.get('rating', 0),
+            'image': product.get('image')
+        }
+        rank = (-product.get('rating', 0), product['name'])
+        entry = (rank, key)
+        terms = self._terms[key] = self._terms_for(product)
+        for term in terms:
+            path = self._path(term, create=True)
+            if path[-1].entries is None:
+                path[-1].entries = {}
+            path[-1].entries[key] = rank
+            # Insertion only has to merge one entry into each node's top list
+            for node in path:
+                top = node.top
+                if len(top) >= self.k and not entry < top[-1]:
+                    continue
+                # Several terms of one product share nodes near the root
+                if entry not in top:
+                    insort(top, entry)
+                    del top[self.k:]
+
+    def remove(self, kind, product):
+        key = (kind, product['id'])
+        self._items.pop(key, None)
+        for term in self._terms.pop(key, ()):
+            path = self._path(term)
+            if path[-1].entries:
+                path[-1].entries.pop(key, None)
+            # Drop branches that no longer lead to any entry
+            for depth in range(len(path) - 1, 0, -1):
+                node = path[depth]
+                if node.children or node.entries:
+                    break
+                del path[depth - 1].children[term[depth - 1]]
+                path.pop()
+            self._refresh(path)
+
+    def listener(self, kind):
+        """CatalogStore listener that keeps products of one kind in the trie"""
+        def on_change(old, new):
+            if old is not None:
+                self.remove(kind, old)
+            if new is not None:
+                self.add(kind, new)
+        return on_change
+
+    def suggest(self, prefix, limit=None):
+        """Best-ranked suggestions whose name or brand starts with prefix"""
+        prefix = ' '.join(_TOKEN.findall(normalize_text(prefix)))[:MAX_TERM_LENGTH]
+        if not prefix:
+            return []
+        path = self._path(prefix)
+        if path is None:
+            return []
+        top = path[-1].top[:limit or self.k]
+        return [self._items[key] for _, key in top]
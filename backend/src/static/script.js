@@ -104,7 +104,7 @@ async function handleLogin(e) {
         const result = await response.json();
 
         if (result.success) {
-            currentUser = result.user;
+            currentUser = { ...result.user, token: result.token };
             saveUserToStorage();
             updateUserDisplay();
             hideModal(document.getElementById("login-modal"));
@@ -139,7 +139,7 @@ async function handleRegister(e) {
         const result = await response.json();
 
         if (result.success) {
-            currentUser = result.user;
+            currentUser = { ...result.user, token: result.token };
             saveUserToStorage();
             updateUserDisplay();
             hideModal(document.getElementById("register-modal"));
@@ -190,11 +190,30 @@ function hideModal(modal) {
     modal.style.display = "none";
 }
 
+// Responsive image variants by product image name
+let productImages = {};
+
+async function loadImageManifest() {
+    try {
+        const response = await fetch("/api/images/manifest");
+        if (response.ok) {
+            const data = await response.json();
+            if (data.success) {
+                productImages = data.images;
+            }
+        }
+    } catch (error) {
+        console.error("Error loading image variants:", error);
+    }
+}
+
 // Load products (games and accessories)
 async function loadProducts() {
     const gamesContainer = document.getElementById("games-container");
     const accessoriesContainer = document.getElementById("accessories-container");
 
+    await loadImageManifest();
+
     // Fetch games
     try {
         const gamesResponse = await fetch("/api/games");
@@ -235,11 +254,26 @@ async function loadProducts() {
     animateProducts();
 }
 
+// Product image, served as a small WebP or JPEG when variants exist
+function createProductImage(product) {
+    const variants = productImages[product.image];
+    const fallback = `<img src="/static/${product.image}" alt="${product.name}" loading="lazy" onerror="this.src='/static/placeholder.jpg'">`;
+    if (!variants || !variants.webp) {
+        return fallback;
+    }
+    const sizes = "(max-width: 600px) 100vw, 320px";
+    return `
+            <picture>
+                <source type="image/webp" srcset="${variants.webp}" sizes="${sizes}">
+                <img src="${variants.src}" srcset="${variants.jpg}" sizes="${sizes}" alt="${product.name}" loading="lazy" onerror="this.src='/static/placeholder.jpg'">
+            </picture>`;
+}
+
 // Create product card HTML
 function createProductCard(product, type) {
     return `
         <div class="product-card ${type}-card">
-            <img src="/static/${product.image}" alt="${product.name}" onerror="this.src='/static/placeholder.jpg'">
+            ${createProductImage(product)}
             <h3>${product.name}</h3>
             <p class="price">${product.price} ريال</p>
             <button class="add-to-cart" data-id="${product.id}" data-type="${type}">أضف إلى السلة</button>
@@ -384,11 +418,13 @@ async function checkout() {
     };
 
     try {
+        const headers = { "Content-Type": "application/json" };
+        if (currentUser.token) {
+            headers["Authorization"] = `Bearer ${currentUser.token}`;
+        }
         const response = await fetch("/api/orders", {
             method: "POST",
-            headers: {
-                "Content-Type": "application/json",
-            },
+            headers,
             body: JSON.stringify(orderData)
         });
 
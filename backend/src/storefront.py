@@ -0,0 +1,64 @@
+from flask import current_app
+from src.catalog import CatalogStore, TopRatedIndex
+from src.catalog_sync import CatalogSync
+from src.facets import FacetIndex
+from src.pricing import PriceBook
+from src.search import SearchIndex, SuggestionTrie
+
+# Most typeahead suggestions one request can ask for
+MAX_SUGGESTIONS = 10
+# Most featured products one request can ask for
+MAX_FEATURED = 50
+
+
+class ProductCatalog:
+    """One product table served from memory: the store, its indexes and its sync"""
+
+    def __init__(self, model, seed, sku_prefix, facet_fields, search_fields=None):
+        self.store = CatalogStore()
+        self.search = SearchIndex(search_fields)
+        self.top_rated = TopRatedIndex()
+        self.facets = FacetIndex(tuple(facet_fields) + ('in_stock',))
+        for index in (self.search, self.top_rated, self.facets):
+            self.store.subscribe(index.on_change)
+        # The catalog lives in the database; each worker serves it from the
+        # indexes above and picks up changes made by other processes
+        self.sync = CatalogSync(model, self.store, seed, sku_prefix=sku_prefix)
+
+
+class Storefront:
+    """Everything an app serves from memory, kept in app.extensions['storefront']
+
+    Built by create_app, so two apps (say, on different databases) never
+    share a catalog.
+    """
+
+    def __init__(self, games, accessories):
+        self.games = games
+        self.accessories = accessories
+        # Catalog prices used to price carts; client prices are never trusted
+        self.price_book = PriceBook()
+        # Typeahead index over game and accessory names and brands
+        self.suggestions = SuggestionTrie(k=MAX_SUGGESTIONS)
+        for kind, catalog in (('game', games), ('accessory', accessories)):
+            catalog.store.subscribe(self.price_book.listener(kind))
+            catalog.store.subscribe(self.suggestions.listener(kind))
+
+    @property
+    def catalogs(self):
+        return (self.games, self.accessories)
+
+    def load(self):
+        """Seed empty tables and load every product"""
+        for catalog in self.catalogs:
+            catalog.sync.load()
+
+    def refresh_if_stale(self):
+        """before_request hook following catalog changes made by other processes"""
+        for catalog in self.catalogs:
+            catalog.sync.refresh_if_stale()
+
+
+def storefront():
+    """The current app's Storefront"""
+    return current_app.extensions['storefront']
@@ -1,11 +1,21 @@
+import os
 import requests
 import json
 from datetime import datetime
+from requests.adapters import HTTPAdapter
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+# Telegram rejects messages longer than this many characters
+MAX_MESSAGE_LENGTH = 4096
 
 class TelegramBot:
-    def __init__(self, token):
+    def __init__(self, token, api_url="https://api.telegram.org", timeout=(3.05, 10)):
         self.token = token
-        self.base_url = f"https://api.telegram.org/bot{token}"
+        self.base_url = f"{api_url.rstrip('/')}/bot{token}"
+        self.timeout = timeout
+        # Reuse keep-alive connections instead of a new TLS handshake per message
+        self.session = requests.Session()
+        self.session.mount(api_url, HTTPAdapter(pool_connections=1, pool_maxsize=4))
     
     def send_message(self, chat_id, text, parse_mode='HTML'):
         """Send a message to a Telegram chat"""
@@ -17,14 +27,14 @@ class TelegramBot:
         }
         
         try:
-            response = requests.post(url, data=data)
+            response = self.session.post(url, data=data, timeout=self.timeout)
             return response.json()
         except Exception as e:
             print(f"Error sending message: {e}")
             return None
     
-    def send_order_notification(self, chat_id, order_data):
-        """Send order notification to Telegram"""
+    def format_order_notification(self, order_data):
+        """Build the order notification text"""
         customer_info = order_data.get('customer_info', {})
         items = order_data.get('items', [])
         total = order_data.get('total', 0)
@@ -45,12 +55,57 @@ class TelegramBot:
             message += f"• {item.get('name', 'منتج غير محدد')} - الكمية: {item.get('quantity', 1)} - السعر: {item.get('price', 0)} ريال\n"
         
         message += f"\n💰 <b>المجموع الكلي: {total} ريال</b>"
-        message += f"\n📅 <b>وقت الطلب:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        message += f"\n📅 <b>وقت الطلب:</b> {order_data.get('created_at') or datetime.now().strftime(TIME_FORMAT)}"
         
-        return self.send_message(chat_id, message)
+        return message
     
-    def send_contact_message(self, chat_id, contact_data):
-        """Send contact form message to Telegram"""
+    def send_order_notification(self, chat_id, order_data):
+        """Send order notification to Telegram"""
+        return self.send_message(chat_id, self.format_order_notification(order_data))
+    
+    def format_order_digest(self, orders):
+        """Build one digest message summarizing several orders"""
+        message = self._digest_header(len(orders))
+        for order in orders:
+            message += self._digest_line(order)
+        return message + self._digest_footer(orders)
+    
+    def split_order_digest(self, orders):
+        """Split orders into runs whose digests each fit in one Telegram message"""
+        parts = []
+        part = []
+        lines_length = 0
+        for order in orders:
+            line_length = len(self._digest_line(order))
+            candidate = part + [order]
+            length = len(self._digest_header(len(candidate))) + lines_length + line_length + len(self._digest_footer(candidate))
+            if part and length > MAX_MESSAGE_LENGTH:
+                parts.append(part)
+                part = []
+                lines_length = 0
+            part.append(order)
+            lines_length += line_length
+        if part:
+            parts.append(part)
+        return parts
+    
+    def _digest_header(self, count):
+        return f"🎮 <b>{count} طلبات جديدة من متجر القيمنق!</b>\n\n"
+    
+    def _digest_footer(self, orders):
+        return f"\n💰 <b>مجموع الطلبات: {sum(order.get('total', 0) for order in orders)} ريال</b>"
+    
+    def _digest_line(self, order):
+        customer_info = order.get('customer_info', {})
+        quantity = sum(item.get('quantity', 1) for item in order.get('items', []))
+        return (
+            f"• {order.get('order_number', '')} - {customer_info.get('name', 'غير محدد')}"
+            f" - {customer_info.get('phone', 'غير محدد')} - {quantity} منتج"
+            f" - {order.get('total', 0)} ريال - {order.get('created_at', '')}\n"
+        )
+    
+    def format_contact_message(self, contact_data):
+        """Build the contact form message text"""
         message = f"""
 📞 <b>رسالة جديدة من موقع متجر القيمنق!</b>
 
@@ -62,13 +117,17 @@ class TelegramBot:
 💬 <b>الرسالة:</b>
 {contact_data.get('message', 'لا توجد رسالة')}
 
-📅 <b>وقت الإرسال:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+📅 <b>وقت الإرسال:</b> {contact_data.get('created_at') or datetime.now().strftime(TIME_FORMAT)}
 """
         
-        return self.send_message(chat_id, message)
+        return message
     
-    def send_user_registration_notification(self, chat_id, user_data):
-        """Send new user registration notification"""
+    def send_contact_message(self, chat_id, contact_data):
+        """Send contact form message to Telegram"""
+        return self.send_message(chat_id, self.format_contact_message(contact_data))
+    
+    def format_user_registration_notification(self, user_data):
+        """Build the new user registration text"""
         message = f"""
 🆕 <b>مستخدم جديد في متجر القيمنق!</b>
 
@@ -77,15 +136,31 @@ class TelegramBot:
 • البريد الإلكتروني: {user_data.get('email', 'غير محدد')}
 • رقم الهاتف: {user_data.get('phone', 'غير محدد')}
 
-📅 <b>تاريخ التسجيل:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+📅 <b>تاريخ التسجيل:</b> {user_data.get('created_at') or datetime.now().strftime(TIME_FORMAT)}
 """
         
-        return self.send_message(chat_id, message)
+        return message
+    
+    def send_user_registration_notification(self, chat_id, user_data):
+        """Send new user registration notification"""
+        return self.send_message(chat_id, self.format_user_registration_notification(user_data))
+
+# Configuration (environment variables take precedence)
+TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN", "YOUR_BOT_TOKEN_HERE")  # Replace with your actual bot token
+TELEGRAM_CHAT_ID = os.environ.get("TELEGRAM_CHAT_ID", "YOUR_CHAT_ID_HERE")        # Replace with your chat ID
+# Point at a local stub server when testing, e.g. http://127.0.0.1:8081
+TELEGRAM_API_URL = os.environ.get("TELEGRAM_API_URL", "https://api.telegram.org")
+
+_telegram_bot = None
 
-# Configuration
-TELEGRAM_BOT_TOKEN = "YOUR_BOT_TOKEN_HERE"  # Replace with your actual bot token
-TELEGRAM_CHAT_ID = "YOUR_CHAT_ID_HERE"      # Replace with your chat ID
+def get_telegram_bot():
+    """The shared bot, created on first use; None when no token is configured
 
-# Initialize bot instance
-telegram_bot = TelegramBot(TELEGRAM_BOT_TOKEN) if TELEGRAM_BOT_TOKEN != "YOUR_BOT_TOKEN_HERE" else None
+    Built lazily so importing the app opens no HTTP session, and a gunicorn
+    worker forked from a preloaded parent gets its own connection pool.
+    """
+    global _telegram_bot
+    if _telegram_bot is None and TELEGRAM_BOT_TOKEN != "YOUR_BOT_TOKEN_HERE":
+        _telegram_bot = TelegramBot(TELEGRAM_BOT_TOKEN, TELEGRAM_API_URL)
+    return _telegram_bot
 
@@ -0,0 +1,90 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from flask import current_app, request
+
+# Number of reverse proxies in front of the app (Render runs one); their
+# X-Forwarded-For entries are trusted to find the client address
+PROXY_HOPS = int(os.environ.get('PROXY_HOPS', '0'))
+# Login attempts allowed per client address and per account in a 5 minute window
+LOGIN_WINDOW = 300
+LOGIN_LIMIT_PER_IP = 30
+LOGIN_LIMIT_PER_EMAIL = 10
+
+
+def client_ip():
+    """Client address as seen by the outermost trusted proxy
+
+    Proxies append to X-Forwarded-For, so entries a client sends itself
+    come first and cannot spoof the ones counted from the end.
+    """
+    if PROXY_HOPS:
+        route = request.access_route
+        return route[-min(PROXY_HOPS, len(route))]
+    return request.remote_addr
+
+
+class SlidingWindowLimiter:
+    """Allows at most limit hits per key within any window seconds
+
+    Keeps the timestamps of recent hits per key. Keys are held in LRU
+    order and capped at max_keys, so a flood of distinct keys (spoofed
+    emails, many IPs) cannot grow memory without bound.
+    """
+
+    def __init__(self, limit, window, max_keys=100_000):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._hits = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key):
+        """Record a hit; returns 0 if allowed, else seconds until the next one is"""
+        now = time.monotonic()
+        with self._lock:
+            hits = self._hits.get(key)
+            if hits is None:
+                hits = self._hits[key] = deque()
+                while len(self._hits) > self.max_keys:
+                    self._hits.popitem(last=False)
+            else:
+                self._hits.move_to_end(key)
+
+            while hits and hits[0] <= now - self.window:
+                hits.popleft()
+            if len(hits) >= self.limit:
+                return hits[0] + self.window - now
+            hits.append(now)
+            return 0
+
+    def reset(self, key):
+        with self._lock:
+            self._hits.pop(key, None)
+
+
+class LoginThrottle:
+    """Login attempt limits for one app, per client address and per account
+
+    Counts are kept in memory, so each gunicorn worker enforces the limits
+    on its own: with N workers a client can make up to N times as many
+    attempts before every worker turns it away.
+    """
+
+    def __init__(self, per_ip=LOGIN_LIMIT_PER_IP, per_email=LOGIN_LIMIT_PER_EMAIL, window=LOGIN_WINDOW):
+        self.by_ip = SlidingWindowLimiter(limit=per_ip, window=window)
+        self.by_email = SlidingWindowLimiter(limit=per_email, window=window)
+
+    def hit(self, ip, email):
+        """Record an attempt; returns 0 if allowed, else seconds to wait"""
+        return max(self.by_ip.hit(ip), self.by_email.hit(email))
+
+    def succeeded(self, email):
+        """Forget an account's failed attempts after a successful login"""
+        self.by_email.reset(email)
+
+
+def login_throttle():
+    """The current app's LoginThrottle, kept in app.extensions['login_throttle']"""
+    return current_app.extensions['login_throttle']
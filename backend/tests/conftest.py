@@ -0,0 +1,57 @@
+import os
+import sys
+
+# Cheap hashes keep the account tests fast; set before src.passwords reads it
+os.environ.setdefault('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+import pytest
+from src.main import create_app
+from src import migrations
+
+
+@pytest.fixture
+def app(tmp_path):
+    """An app on a fresh, migrated and seeded SQLite database, without background threads"""
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'test.db'}",
+        'BACKGROUND_WORKERS': False
+    })
+    with app.app_context():
+        migrations.upgrade(echo=lambda message: None)
+        app.extensions['storefront'].load()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def register(client):
+    """Register and log in a user; returns the login response body"""
+    def register(email, password='secret123', **extra):
+        response = client.post('/api/users/register', json={
+            'name': 'Test', 'email': email, 'password': password, 'phone': '0500000000'
+        })
+        assert response.status_code == 201, response.get_json()
+        response = client.post('/api/users/login', json={'email': email, 'password': password, **extra})
+        assert response.status_code == 200, response.get_json()
+        return response.get_json()
+    return register
+
+
+@pytest.fixture
+def place_order(client):
+    """Place an order, by default one unit of game 1; returns the order"""
+    def place_order(items=None, headers=None, status=201, **extra):
+        response = client.post('/api/orders', json={
+            'items': items or [{'type': 'game', 'id': 1, 'quantity': 1}],
+            'customer_info': {'name': 'Test', 'email': 'a@example.com', 'phone': '0500000000'},
+            **extra
+        }, headers=headers)
+        assert response.status_code == status, response.get_json()
+        return response.get_json().get('order')
+    return place_order
@@ -0,0 +1,52 @@
+import pytest
+from src import auth
+
+
+def me(client, token):
+    return client.get('/api/users/me', headers={'Authorization': f'Bearer {token}'})
+
+
+def test_token_identifies_the_user(client, register):
+    login = register('a@example.com')
+    response = me(client, login['token'])
+    assert response.status_code == 200
+    assert response.get_json()['user']['email'] == 'a@example.com'
+    assert 'fingerprint' not in response.get_json()['user']
+
+
+@pytest.mark.parametrize('header', ['', 'Bearer', 'Bearer not-a-token', 'Basic abc'])
+def test_missing_or_forged_tokens_are_refused(client, header):
+    assert client.get('/api/users/me', headers={'Authorization': header}).status_code == 401
+
+
+def test_tampered_token_is_refused(client, register):
+    token = register('a@example.com')['token']
+    assert me(client, token[:-2] + ('AA' if token[-2:] != 'AA' else 'BB')).status_code == 401
+
+
+def test_changing_the_password_voids_earlier_tokens(client, register):
+    login = register('a@example.com')
+    response = client.put(f"/api/users/profile/{login['user']['id']}", json={'password': 'another123'},
+                          headers={'Authorization': f"Bearer {login['token']}"})
+    assert response.status_code == 200
+
+    assert me(client, login['token']).status_code == 401
+    assert me(client, response.get_json()['token']).status_code == 200
+
+
+def test_other_profile_changes_keep_the_token(client, register):
+    login = register('a@example.com')
+    client.put(f"/api/users/profile/{login['user']['id']}", json={'name': 'Renamed'},
+               headers={'Authorization': f"Bearer {login['token']}"})
+    assert me(client, login['token']).get_json()['user']['name'] == 'Renamed'
+
+
+def test_expired_tokens_are_refused(client, register, monkeypatch):
+    token = register('a@example.com')['token']
+    monkeypatch.setattr(auth, 'TOKEN_MAX_AGE', -1)
+    assert me(client, token).status_code == 401
+
+
+def test_fingerprint_follows_the_password_hash():
+    assert auth.password_fingerprint('scrypt$a$b') == auth.password_fingerprint('scrypt$a$b')
+    assert auth.password_fingerprint('scrypt$a$b') != auth.password_fingerprint('scrypt$a$c')
@@ -0,0 +1,53 @@
+import pytest
+from src.carts import decode_items, encode_items
+from src.pricing import MAX_QUANTITY
+
+
+@pytest.mark.parametrize('items', [
+    {},
+    {('game', 1): 2},
+    {('accessory', 12): 1, ('game', 3): MAX_QUANTITY, ('game', 1): 5},
+])
+def test_cart_encoding_round_trips_in_order(items):
+    text = encode_items(items)
+    assert decode_items(text) == items
+    assert list(decode_items(text)) == list(items)
+
+
+def test_cart_encoding_is_compact():
+    assert encode_items({('game', 1): 2, ('accessory', 3): 1}) == 'g1:2,a3:1'
+    assert decode_items('') == {}
+
+
+def add(client, cart_id, kind, product_id, quantity):
+    return client.post(f'/api/cart/{cart_id}/items', json={'type': kind, 'id': product_id, 'quantity': quantity})
+
+
+def test_cart_lines_are_priced_and_capped(client):
+    cart_id = client.post('/api/cart').get_json()['cart']['id']
+    add(client, cart_id, 'game', 1, 2)
+    add(client, cart_id, 'game', 1, MAX_QUANTITY)
+    assert add(client, cart_id, 'game', 999, 1).status_code == 400
+
+    cart = client.get(f'/api/cart/{cart_id}').get_json()['cart']
+    assert [(line['id'], line['quantity']) for line in cart['items']] == [(1, MAX_QUANTITY)]
+    assert cart['total'] == cart['items'][0]['price'] * MAX_QUANTITY
+
+
+def test_logging_in_folds_the_anonymous_cart_into_the_users(client, register):
+    first = register('a@example.com')
+    add(client, first['cart_id'], 'game', 1, 1)
+
+    anonymous = client.post('/api/cart').get_json()['cart']['id']
+    add(client, anonymous, 'game', 1, 2)
+    add(client, anonymous, 'accessory', 3, 1)
+    login = client.post('/api/users/login', json={
+        'email': 'a@example.com', 'password': 'secret123', 'cart_id': anonymous
+    }).get_json()
+
+    assert login['cart_id'] == first['cart_id']
+    cart = client.get(f"/api/cart/{login['cart_id']}").get_json()['cart']
+    assert {(line['type'], line['id']): line['quantity'] for line in cart['items']} == {
+        ('game', 1): 3, ('accessory', 3): 1
+    }
+    assert client.get(f'/api/cart/{anonymous}').status_code == 404
@@ -0,0 +1,29 @@
+import pytest
+from src.images import ImagePipeline
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    (tmp_path / 'static').mkdir()
+    (tmp_path / 'static' / 'cover.png').write_bytes(b'not really a png')
+    (tmp_path / 'outside.png').write_bytes(b'private')
+    return ImagePipeline(str(tmp_path / 'static'), cache_dir=str(tmp_path / 'cache'))
+
+
+@pytest.mark.parametrize('image', ['../outside.png', '..\\outside.png', 'sub/cover.png', '.hidden.png', ''])
+def test_only_plain_file_names_are_hashed(pipeline, image):
+    assert pipeline.source_hash(image) is None
+    assert pipeline.variants(image, '/api/images') is None
+
+
+def test_source_hashes_are_capped(pipeline, tmp_path, monkeypatch):
+    monkeypatch.setattr('src.images.MAX_HASHES', 1)
+    (tmp_path / 'static' / 'other.png').write_bytes(b'another')
+    assert pipeline.source_hash('cover.png')
+    assert pipeline.source_hash('other.png')
+    assert list(pipeline._hashes) == ['other.png']
+
+
+def test_manifest_only_lists_catalog_images(client):
+    images = client.get('/api/images/manifest?image=../../../../../usr/share/pixmaps/debian-logo.png').get_json()['images']
+    assert images == {}
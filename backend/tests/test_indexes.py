@@ -0,0 +1,165 @@
+"""The catalog indexes checked against brute-force scans of the same products"""
+import random
+import re
+import pytest
+from src.catalog import CatalogStore, TopRatedIndex, field_values, normalize
+from src.facets import FacetIndex
+from src.search import SearchIndex, SuggestionTrie, normalize_text, query_terms, tokenize
+
+WORDS = ['Call', 'of', 'Duty', 'duty', 'Elden', 'Ring', 'سماعات', 'السماعات', 'قيمنق', 'الألعاب', 'ماوس', 'FIFA', '2024']
+CATEGORIES = ['action', 'Action', 'rpg', 'sports', 'audio']
+PLATFORMS = ['PS5', 'ps5', 'Xbox', 'PC']
+BRANDS = ['Razer', 'razer', 'Logitech', 'HyperX', None]
+FIELDS = ('category', 'platform', 'brand', 'in_stock')
+
+
+def random_product(rng, product_id):
+    return {
+        'id': product_id,
+        'name': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 3))),
+        'description': ' '.join(rng.choice(WORDS) for _ in range(rng.randint(0, 4))),
+        'category': rng.choice(CATEGORIES),
+        'platform': rng.sample(PLATFORMS, rng.randint(0, 3)),
+        'brand': rng.choice(BRANDS),
+        'price': rng.choice([10, 99.5, 150, 150, 300, 1299]),
+        'rating': rng.choice([3.5, 4.0, 4.5, 4.5, 4.9]),
+        'in_stock': rng.random() < 0.8
+    }
+
+
+@pytest.fixture(params=range(5))
+def catalog(request):
+    """A store with every index subscribed, after random inserts, replacements and removals"""
+    rng = random.Random(request.param)
+    store = CatalogStore()
+    facets = FacetIndex(FIELDS)
+    search = SearchIndex({'name': 3, 'description': 1})
+    top_rated = TopRatedIndex()
+    trie = SuggestionTrie(k=5)
+    store.subscribe(facets.on_change)
+    store.subscribe(search.on_change)
+    store.subscribe(top_rated.on_change)
+    store.subscribe(trie.listener('game'))
+    for _ in range(300):
+        product_id = rng.randint(1, 60)
+        if rng.random() < 0.2:
+            store.remove(product_id)
+        else:
+            store.upsert(random_product(rng, product_id))
+    return rng, store, facets, search, top_rated, trie
+
+
+def matches(product, field, condition):
+    if field in ('price', 'rating'):
+        low, high = condition
+        value = product.get(field, 0)
+        return (low is None or value >= low) and (high is None or value <= high)
+    wanted = {normalize(value) for value in condition}
+    return any(normalize(value) in wanted for value in field_values(product, field))
+
+
+def random_criteria(rng):
+    criteria = {}
+    if rng.random() < 0.5:
+        criteria['category'] = rng.sample(CATEGORIES, rng.randint(1, 2))
+    if rng.random() < 0.5:
+        criteria['platform'] = rng.sample(PLATFORMS, rng.randint(1, 2))
+    if rng.random() < 0.3:
+        criteria['brand'] = [rng.choice([brand for brand in BRANDS if brand])]
+    if rng.random() < 0.3:
+        criteria['in_stock'] = [rng.random() < 0.5]
+    if rng.random() < 0.4:
+        criteria['price'] = (rng.choice([None, 50, 150]), rng.choice([None, 150, 500]))
+    if rng.random() < 0.3:
+        criteria['rating'] = (rng.choice([4.0, 4.5]), None)
+    return criteria
+
+
+def test_facet_queries_and_counts_match_a_scan(catalog):
+    rng, store, facets, *_ = catalog
+    products = store.all()
+    for _ in range(100):
+        criteria = random_criteria(rng)
+        match = rng.choice(['all', 'any'])
+        combine = any if match == 'any' else all
+
+        ids, counts = facets.query(criteria, match, with_counts=True)
+        expected = sorted(
+            product['id'] for product in products
+            if not criteria or combine(matches(product, field, condition) for field, condition in criteria.items())
+        )
+        assert ids == expected
+
+        for field in FIELDS:
+            if match == 'any' or field not in criteria:
+                base = [store.get(product_id) for product_id in expected]
+            else:
+                base = [
+                    product for product in products
+                    if all(matches(product, other, condition) for other, condition in criteria.items() if other != field)
+                ]
+            values = {normalize(value) for product in products for value in field_values(product, field)}
+            expected_counts = {
+                value: sum(1 for product in base if matches(product, field, [value])) for value in values
+            }
+            assert {normalize(label): count for label, count in counts[field].items()} == expected_counts
+
+
+def test_facet_values_are_the_values_in_the_catalog(catalog):
+    _, store, facets, *_ = catalog
+    for field in FIELDS:
+        expected = {normalize(value) for product in store.all() for value in field_values(product, field)}
+        assert {normalize(value) for value in facets.values(field)} == expected
+
+
+@pytest.mark.parametrize('query', ['duty', 'DUT', 'call duty', 'السماعات', 'سماع', 'الألعاب قيمنق', 'fifa 20', 'zzz', ''])
+def test_search_matches_a_scan(catalog, query):
+    _, store, _, search, *_ = catalog
+    terms = query_terms(query)
+    expected = set()
+    if terms:
+        for product in store.all():
+            tokens = tokenize(product['name']) + tokenize(product['description'])
+            if all(any(token.startswith(term) for token in tokens) for term in terms):
+                expected.add(product['id'])
+    assert set(search.search(query)) == expected
+
+
+@pytest.mark.parametrize('prefix', ['d', 'duty', 'call of', 'r', 'RAZ', 'س', 'السماعات', 'of duty', 'x'])
+def test_suggestions_match_a_scan(catalog, prefix):
+    _, store, _, _, _, trie = catalog
+    wanted = ' '.join(re.findall(r'\w+', normalize_text(prefix)))
+
+    def terms(product):
+        words = re.findall(r'\w+', normalize_text(product['name']))
+        found = {' '.join(words[start:]) for start in range(len(words))}
+        if product.get('brand'):
+            found.add(' '.join(re.findall(r'\w+', normalize_text(product['brand']))))
+        return found
+
+    candidates = [product for product in store.all() if any(term.startswith(wanted) for term in terms(product))]
+    candidates.sort(key=lambda product: (-product['rating'], product['name'], product['id']))
+    assert [item['id'] for item in trie.suggest(prefix)] == [product['id'] for product in candidates[:5]]
+
+
+@pytest.mark.parametrize('category', [None, 'action', 'RPG', 'audio', 'missing'])
+def test_top_rated_matches_a_scan(catalog, category):
+    _, store, _, _, top_rated, _ = catalog
+    ranked = sorted(
+        (product for product in store.all()
+         if product['in_stock'] and (category is None or product['category'].lower() == category.lower())),
+        key=lambda product: (-product['rating'], product['id'])
+    )
+    assert top_rated.top(7, category) == [product['id'] for product in ranked[:7]]
+
+
+def test_price_range_matches_a_scan(catalog):
+    _, store, *_ = catalog
+    for low, high in [(None, None), (50, 150), (150, 150), (None, 99.5), (300, None), (2000, None)]:
+        expected = [
+            product for product in store.all()
+            if (low is None or product['price'] >= low) and (high is None or product['price'] <= high)
+        ]
+        result = store.by_price(low, high)
+        assert sorted(product['id'] for product in result) == sorted(product['id'] for product in expected)
+        assert [product['price'] for product in result] == sorted(product['price'] for product in result)
@@ -0,0 +1,81 @@
+import sqlite3
+import pytest
+from sqlalchemy import inspect, text
+from src import migrations
+from src.main import create_app
+from src.models.user import db
+
+
+@pytest.fixture
+def fresh_app(tmp_path):
+    """An app on an empty SQLite database, not migrated yet"""
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'fresh.db'}",
+        'BACKGROUND_WORKERS': False
+    })
+
+
+def test_upgrade_builds_the_models_schema_and_is_idempotent(fresh_app):
+    with fresh_app.app_context():
+        assert not migrations.is_current()
+        assert migrations.upgrade(echo=lambda message: None) == len(migrations.migrations())
+        assert migrations.is_current()
+        assert migrations.upgrade(echo=lambda message: None) == 0
+
+        inspector = inspect(db.engine)
+        for table in db.metadata.sorted_tables:
+            columns = {column['name'] for column in inspector.get_columns(table.name)}
+            assert columns == set(table.columns.keys()), table.name
+        user_indexes = set(db.session.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'user'"
+        )).scalars())
+        assert {'ix_user_email_lower', 'ix_user_created_at'} <= user_indexes
+
+
+def test_upgrade_can_stop_at_a_version(fresh_app):
+    with fresh_app.app_context():
+        assert migrations.upgrade(2, echo=lambda message: None) == 2
+        assert [version for version, _, _ in migrations.pending()] == [3, 4]
+
+
+def test_legacy_database_keeps_its_users(fresh_app, tmp_path):
+    connection = sqlite3.connect(tmp_path / 'fresh.db')
+    connection.execute(
+        'CREATE TABLE user (id INTEGER PRIMARY KEY, username VARCHAR(80) UNIQUE NOT NULL, '
+        'email VARCHAR(120) UNIQUE NOT NULL, created_at DATETIME, updated_at DATETIME)'
+    )
+    connection.execute("INSERT INTO user VALUES (7, 'legacy', 'legacy@example.com', NULL, NULL)")
+    connection.commit()
+    connection.close()
+
+    with fresh_app.app_context():
+        migrations.upgrade(echo=lambda message: None)
+        rows = db.session.execute(text('SELECT id, username, email, password_hash FROM "user"')).all()
+        assert rows == [(7, 'legacy', 'legacy@example.com', '')]
+        # Legacy accounts cannot log in until their password is reset
+        response = fresh_app.test_client().post('/api/users/login', json={
+            'email': 'legacy@example.com', 'password': 'anything'
+        })
+        assert response.status_code == 401
+
+
+def test_user_ids_survive_the_autoincrement_rebuild(fresh_app):
+    def execute(sql):
+        return db.session.execute(text(sql))
+
+    with fresh_app.app_context():
+        migrations.upgrade(3, echo=lambda message: None)
+        execute("""INSERT INTO "user" (id, username, email, password_hash)
+                   VALUES (1, 'a', 'a@example.com', ''), (2, 'b', 'b@example.com', '')""")
+        execute("INSERT INTO carts (id, user_id, items, expires_at) VALUES ('c2', 2, '', '2999-01-01')")
+        db.session.commit()
+
+        migrations.upgrade(echo=lambda message: None)
+        assert execute('SELECT user_id FROM carts').scalar() == 2
+        assert execute('PRAGMA foreign_key_check').all() == []
+
+        execute('DELETE FROM "user" WHERE id = 2')
+        execute("""INSERT INTO "user" (username, email, password_hash) VALUES ('c', 'c@example.com', '')""")
+        assert execute("""SELECT id FROM "user" WHERE email = 'c@example.com'""").scalar() == 3
+        # The cart went with its user
+        assert execute('SELECT count(*) FROM carts').scalar() == 0
@@ -0,0 +1,33 @@
+import time
+from datetime import datetime
+from src.models.notification import WorkerLease
+from src.models.user import db
+from src.notifications import NotificationWorker
+
+
+class Bot:
+    def send_message(self, chat_id, text):
+        return {'ok': True}
+
+
+def test_one_worker_at_a_time_holds_the_lease(app):
+    first, second = NotificationWorker(app, bot=Bot()), NotificationWorker(app, bot=Bot())
+    with app.app_context():
+        assert first.hold_lease()
+        assert not second.hold_lease()
+        assert first.hold_lease()
+
+
+def test_a_stopped_worker_hands_the_lease_over(app):
+    worker = NotificationWorker(app, bot=Bot(), poll_interval=0.01)
+    worker.start()
+    deadline = time.monotonic() + 5
+    while worker._lease_until is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert worker._lease_until is not None
+    worker.stop()
+    assert not worker.is_alive()
+
+    with app.app_context():
+        assert db.session.get(WorkerLease, 'telegram').expires_at <= datetime.utcnow()
+        assert NotificationWorker(app, bot=Bot()).hold_lease()
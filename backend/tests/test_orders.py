@@ -0,0 +1,105 @@
+import pytest
+from src.models.product import Game
+from src.models.inventory import InventoryMovement
+from src.models.user import db
+
+
+def set_stock(app, game_id, quantity, in_stock=True):
+    with app.app_context():
+        game = db.session.get(Game, game_id)
+        game.stock_quantity = quantity
+        game.in_stock = in_stock
+        db.session.commit()
+
+
+def stock_of(app, game_id):
+    with app.app_context():
+        game = db.session.get(Game, game_id)
+        return game.stock_quantity, game.in_stock
+
+
+def walk(client, url, key):
+    """Every item of a keyset-paginated list, following next_cursor"""
+    items, cursor = [], None
+    while True:
+        body = client.get(url + (f'&after={cursor}' if cursor else '')).get_json()
+        items.extend(body[key])
+        cursor = body['next_cursor']
+        if cursor is None:
+            return items
+
+
+def test_orders_list_counts_the_page(client, place_order):
+    for _ in range(3):
+        place_order()
+    body = client.get('/api/orders?limit=2').get_json()
+    assert body['count'] == 2 and 'total' not in body
+    assert body['next_cursor']
+
+
+@pytest.mark.parametrize('query', ['user_id=abc', 'user_id=1.5', 'limit=0', 'after=not-a-cursor', 'after=WzFd'])
+def test_bad_list_parameters_are_rejected(client, query):
+    assert client.get(f'/api/orders?{query}').status_code == 400
+
+
+@pytest.mark.parametrize('limit', [1, 2, 3, 7, 50])
+def test_order_pages_cover_every_order_once_newest_first(client, place_order, limit):
+    placed = [place_order()['id'] for _ in range(7)]
+    seen = [order['id'] for order in walk(client, f'/api/orders?limit={limit}', 'orders')]
+    assert seen == placed[::-1]
+
+
+def test_order_pages_narrowed_to_one_customer(client, place_order, register):
+    login = register('a@example.com')
+    headers = {'Authorization': f"Bearer {login['token']}"}
+    mine = [place_order(headers=headers)['id'] for _ in range(3)]
+    place_order()
+    orders = walk(client, f"/api/orders?limit=2&user_id={login['user']['id']}", 'orders')
+    assert [order['id'] for order in orders] == mine[::-1]
+
+
+def test_user_pages_cover_every_user_once(client, register):
+    for number in range(5):
+        register(f'user{number}@example.com')
+    users = walk(client, '/api/users?limit=2', 'users')
+    assert [user['email'] for user in users] == [f'user{number}@example.com' for number in range(5)]
+
+
+def test_checkout_reserves_stock_and_cancelling_releases_it(app, client, place_order):
+    set_stock(app, 1, 3)
+    order = place_order([{'type': 'game', 'id': 1, 'quantity': 2}])
+    assert stock_of(app, 1) == (1, True)
+
+    place_order([{'type': 'game', 'id': 1, 'quantity': 2}], status=409)
+    last = place_order([{'type': 'game', 'id': 1, 'quantity': 1}])
+    assert stock_of(app, 1) == (0, False)
+
+    assert client.put(f"/api/orders/{order['id']}/status", json={'status': 'cancelled'}).status_code == 200
+    assert stock_of(app, 1) == (2, True)
+    with app.app_context():
+        movements = InventoryMovement.query.order_by(InventoryMovement.id).all()
+        assert [(m.order_id, m.delta, m.reason) for m in movements] == [
+            (order['id'], -2, 'reserve'), (last['id'], -1, 'reserve'), (order['id'], 2, 'release')
+        ]
+
+    # Cancelling twice does not return the stock twice
+    client.put(f"/api/orders/{order['id']}/status", json={'status': 'cancelled'})
+    assert stock_of(app, 1) == (2, True)
+
+
+def test_reopening_a_cancelled_order_needs_the_stock_back(app, client, place_order):
+    set_stock(app, 1, 1)
+    order = place_order()
+    client.put(f"/api/orders/{order['id']}/status", json={'status': 'cancelled'})
+    place_order()
+    response = client.put(f"/api/orders/{order['id']}/status", json={'status': 'pending'})
+    assert response.status_code == 409
+    assert stock_of(app, 1) == (0, False)
+
+
+def test_releasing_stock_keeps_a_product_an_admin_took_off_sale(app, client, place_order):
+    set_stock(app, 1, 5)
+    order = place_order()
+    set_stock(app, 1, 4, in_stock=False)
+    client.put(f"/api/orders/{order['id']}/status", json={'status': 'cancelled'})
+    assert stock_of(app, 1) == (5, False)
@@ -0,0 +1,38 @@
+import pytest
+from src.pagination import decode_cursor, encode_cursor, slice_by_id
+
+
+@pytest.mark.parametrize('values', [(1,), ('2024-01-01T10:00:00.123456', 42), ('ا', None)])
+def test_cursors_round_trip(values):
+    cursor = encode_cursor(*values)
+    assert '=' not in cursor and '/' not in cursor
+    assert decode_cursor(cursor) == list(values)
+
+
+@pytest.mark.parametrize('cursor', ['', '!!!', 'e30', 'W10', encode_cursor()])
+def test_malformed_cursors_raise_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize('limit', [1, 2, 3, 10])
+def test_slices_cover_the_list_once(limit):
+    items = [{'id': product_id} for product_id in (1, 2, 5, 8, 9, 13)]
+    seen, after = [], None
+    while True:
+        page, cursor = slice_by_id(items, limit, after)
+        seen.extend(page)
+        if cursor is None:
+            break
+        after = decode_cursor(cursor)
+    assert seen == items
+
+
+def test_slice_resumes_after_a_removed_id():
+    page, cursor = slice_by_id([1, 2, 4, 5], 2, [3], key=int)
+    assert page == [4, 5] and cursor is None
+
+
+def test_slice_rejects_a_cursor_without_an_id():
+    with pytest.raises(ValueError):
+        slice_by_id([1, 2], 1, ['x'], key=int)
@@ -0,0 +1,46 @@
+import pytest
+from src.pricing import MAX_QUANTITY, PriceBook, PricingError
+
+CUSTOMER = {'name': 'Test', 'email': 'a@example.com', 'phone': '0500000000'}
+
+
+@pytest.fixture
+def price_book():
+    price_book = PriceBook()
+    on_change = price_book.listener('game')
+    on_change(None, {'id': 1, 'name': 'FIFA', 'price': 10.5, 'in_stock': True})
+    on_change(None, {'id': 2, 'name': 'Sold out', 'price': 20, 'in_stock': False})
+    return price_book
+
+
+def test_cart_is_priced_from_the_catalog(price_book):
+    lines, total = price_book.price_cart([{'type': 'game', 'id': '1', 'quantity': 3, 'price': 0.01}])
+    assert lines == [{'type': 'game', 'id': 1, 'name': 'FIFA', 'price': 10.5, 'quantity': 3}]
+    assert total == 31.5
+
+
+@pytest.mark.parametrize('items', [
+    ['x'],
+    'x',
+    [{'type': 'game', 'id': 1, 'quantity': 0}],
+    [{'type': 'game', 'id': 1, 'quantity': MAX_QUANTITY + 1}],
+    [{'type': 'game', 'id': 1, 'quantity': 10 ** 30}],
+    [{'type': 'game', 'id': 'one', 'quantity': 1}],
+    [{'type': 'game', 'id': 2, 'quantity': 1}],
+    [{'type': 'accessory', 'id': 1, 'quantity': 1}],
+])
+def test_bad_items_are_pricing_errors(price_book, items):
+    with pytest.raises(PricingError):
+        price_book.price_cart(items)
+
+
+def test_removed_products_are_unpriced(price_book):
+    price_book.listener('game')({'id': 1}, None)
+    with pytest.raises(PricingError):
+        price_book.price_line('game', 1, 1)
+
+
+@pytest.mark.parametrize('items', [['x'], [{'type': 'game', 'id': 1, 'quantity': 10 ** 30}]])
+def test_orders_with_bad_items_are_rejected(client, items):
+    response = client.post('/api/orders', json={'items': items, 'customer_info': CUSTOMER})
+    assert response.status_code == 400
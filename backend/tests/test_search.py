@@ -0,0 +1,21 @@
+from src.search import SearchIndex
+
+
+def index_of(*names):
+    index = SearchIndex()
+    for product_id, name in enumerate(names, 1):
+        index.add({'id': product_id, 'name': name, 'description': ''})
+    return index
+
+
+def test_article_is_ignored_on_either_side():
+    index = index_of('سماعات قيمنق', 'السماعات اللاسلكية')
+    assert sorted(index.search('السماعات')) == [1, 2]
+    assert sorted(index.search('سماعات')) == [1, 2]
+
+
+def test_search_results_are_not_response_cached(app, client):
+    for query in ('fifa', 'call', 'elden'):
+        assert client.get(f'/api/games/search?q={query}').status_code == 200
+        assert client.get(f'/api/accessories/search?q={query}').status_code == 200
+    assert len(app.extensions['response_cache']._entries) == 0
@@ -0,0 +1,14 @@
+from src.main import create_app
+
+
+def test_login_attempts_are_limited_per_app(app, client, register):
+    register('a@example.com')
+    for _ in range(10):
+        client.post('/api/users/login', json={'email': 'a@example.com', 'password': 'wrong-password'})
+    response = client.post('/api/users/login', json={'email': 'a@example.com', 'password': 'secret123'})
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) > 0
+
+    other = create_app({'SQLALCHEMY_DATABASE_URI': app.config['SQLALCHEMY_DATABASE_URI'], 'BACKGROUND_WORKERS': False})
+    response = other.test_client().post('/api/users/login', json={'email': 'a@example.com', 'password': 'secret123'})
+    assert response.status_code == 200
@@ -0,0 +1,45 @@
+from sqlalchemy import text
+from src.models.cart import Cart
+from src.models.user import db
+
+CUSTOMER = {'name': 'Test', 'email': 'a@example.com', 'phone': '0500000000'}
+
+
+def auth(login):
+    return {'Authorization': f"Bearer {login['token']}"}
+
+
+def test_deleted_users_cart_and_orders_do_not_pass_to_a_new_account(client, register):
+    cart = client.post('/api/cart').get_json()['cart']
+    client.post(f"/api/cart/{cart['id']}/items", json={'type': 'game', 'id': 1, 'quantity': 2})
+    first = register('a@example.com', cart_id=cart['id'])
+    order = client.post('/api/orders', json={
+        'items': [{'type': 'game', 'id': 2, 'quantity': 1}], 'customer_info': CUSTOMER
+    }, headers=auth(first))
+    assert order.status_code == 201
+
+    assert client.delete(f"/api/users/{first['user']['id']}").status_code == 200
+
+    second = register('b@example.com')
+    assert second['cart_id'] != first['cart_id']
+    assert client.get(f"/api/cart/{second['cart_id']}").get_json()['cart']['items'] == []
+    orders = client.get(f"/api/orders?user_id={second['user']['id']}").get_json()['orders']
+    assert orders == []
+
+
+def test_sqlite_enforces_on_delete_rules(app, client, register):
+    login = register('a@example.com')
+    with app.app_context():
+        db.session.execute(text('DELETE FROM "user" WHERE id = :id'), {'id': login['user']['id']})
+        db.session.commit()
+        assert db.session.get(Cart, login['cart_id']) is None
+
+
+def test_deleted_users_id_and_token_are_not_reused(client, register):
+    register('a@example.com')
+    deleted = register('b@example.com')
+    assert client.delete(f"/api/users/{deleted['user']['id']}").status_code == 200
+
+    newcomer = register('c@example.com')
+    assert newcomer['user']['id'] > deleted['user']['id']
+    assert client.get('/api/users/me', headers=auth(deleted)).status_code == 401